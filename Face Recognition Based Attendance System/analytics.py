@@ -0,0 +1,188 @@
+import csv
+import io
+import os
+import sqlite3
+import threading
+import zlib
+
+
+class AttendanceAnalytics:
+    """Attendance aggregates across all dates and subjects, updated incrementally
+
+    Aggregates per (subject, student) and per (subject, date) are kept in
+    analytics.db. refresh() only consumes what is new since the last run:
+    for the CSV store the bytes appended to each attendance file since the
+    stored offset, for the SQLite store the rows past the stored rowid
+    watermark. Each file's offset is stored with a CRC-32 of the bytes
+    before it, and a file whose already-read bytes changed (it was
+    rewritten, whatever its new size) is re-read on its own.
+    """
+
+    def __init__(self, store, database="analytics.db"):
+        self.store = store
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(database, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS presence (
+                subject TEXT NOT NULL, date TEXT NOT NULL, student_id TEXT NOT NULL,
+                PRIMARY KEY (subject, date, student_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS subject_student (
+                subject TEXT NOT NULL, student_id TEXT NOT NULL, attended INTEGER NOT NULL,
+                PRIMARY KEY (subject, student_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS subject_date (
+                subject TEXT NOT NULL, date TEXT NOT NULL, headcount INTEGER NOT NULL,
+                PRIMARY KEY (subject, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, position INTEGER,
+                fingerprint INTEGER
+            );
+            """
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sources)")]
+        if 'fingerprint' not in columns:
+            # Older databases have no fingerprint; their CSV files are re-read once
+            self.conn.execute("ALTER TABLE sources ADD COLUMN fingerprint INTEGER")
+        self.conn.commit()
+
+    def refresh(self):
+        """Fold new attendance marks into the aggregates; returns marks added"""
+        self.store.flush()
+        with self.lock, self.conn:
+            if self.store.name == 'sqlite':
+                return self._refresh_sqlite()
+            return self._refresh_csv()
+
+    def _add(self, subject, date, student_id):
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO presence VALUES (?, ?, ?)", (subject, date, student_id)
+        )
+        if cursor.rowcount == 0:
+            return 0
+        self.conn.execute(
+            "INSERT INTO subject_student VALUES (?, ?, 1) ON CONFLICT(subject, student_id)"
+            " DO UPDATE SET attended = attended + 1", (subject, student_id)
+        )
+        self.conn.execute(
+            "INSERT INTO subject_date VALUES (?, ?, 1) ON CONFLICT(subject, date)"
+            " DO UPDATE SET headcount = headcount + 1", (subject, date)
+        )
+        return 1
+
+    def _remove_session(self, subject, date):
+        """Undo everything counted for one subject/date before re-reading it"""
+        self.conn.execute(
+            "UPDATE subject_student SET attended = attended - 1 WHERE subject = ? AND student_id IN"
+            " (SELECT student_id FROM presence WHERE subject = ? AND date = ?)",
+            (subject, subject, date)
+        )
+        self.conn.execute("DELETE FROM presence WHERE subject = ? AND date = ?", (subject, date))
+        self.conn.execute("DELETE FROM subject_date WHERE subject = ? AND date = ?", (subject, date))
+
+    def _refresh_csv(self):
+        directory = self.store.directory
+        known = {
+            source: (mtime, size, position, fingerprint)
+            for source, mtime, size, position, fingerprint in self.conn.execute(
+                "SELECT source, mtime, size, position, fingerprint FROM sources")
+        }
+        added = 0
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".csv") or "_" not in entry.name:
+                continue
+            stat = entry.stat()
+            mtime, size, position, fingerprint = known.get(entry.name, (None, 0, 0, 0))
+            if mtime == stat.st_mtime_ns and size == stat.st_size:
+                continue
+
+            subject, date = entry.name[:-4].rsplit("_", 1)
+            with open(entry.path, 'rb') as f:
+                data = f.read()
+            if position and (len(data) < position or zlib.crc32(data[:position]) != fingerprint):
+                # The file was rewritten rather than appended to
+                self._remove_session(subject, date)
+                position = 0
+            if not position:
+                fingerprint = 0  # CRC-32 of no bytes
+
+            data = data[position:]
+            # Only consume complete lines; a partial last line is picked up next time
+            complete = data[:data.rfind(b"\n") + 1]
+            lines = complete.decode('utf-8').splitlines()
+            if position == 0 and lines:
+                lines = lines[1:]  # Header
+            for row in csv.reader(io.StringIO("\n".join(lines))):
+                if row:
+                    added += self._add(subject, date, row[0].strip())
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (entry.name, stat.st_mtime_ns, stat.st_size, position + len(complete),
+                 zlib.crc32(complete, fingerprint))
+            )
+        return added
+
+    def _refresh_sqlite(self):
+        row = self.conn.execute("SELECT position FROM sources WHERE source = 'sqlite'").fetchone()
+        watermark = row[0] if row else 0
+        added = 0
+        for rowid, subject, date, student_id in self.store.rows_after(watermark):
+            added += self._add(subject, date, student_id)
+            watermark = rowid
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sources VALUES ('sqlite', NULL, NULL, ?, NULL)", (watermark,)
+        )
+        return added
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def session_count(self, subject):
+        return self._query("SELECT COUNT(*) FROM subject_date WHERE subject = ?", (subject,))[0][0]
+
+    def session_headcounts(self, subject):
+        """[(date, headcount)] for every session of a subject"""
+        return self._query(
+            "SELECT date, headcount FROM subject_date WHERE subject = ? ORDER BY date", (subject,)
+        )
+
+    def student_percentages(self, subject, roster=None):
+        """[(student_id, attended, sessions, percentage)] sorted by percentage
+
+        Students in roster who never attended are included with 0%.
+        """
+        sessions = self.session_count(subject)
+        attended = dict(self._query(
+            "SELECT student_id, attended FROM subject_student WHERE subject = ? AND attended > 0",
+            (subject,)
+        ))
+        for student_id in roster or ():
+            attended.setdefault(student_id, 0)
+        results = [
+            (student_id, count, sessions, 100.0 * count / sessions if sessions else 0.0)
+            for student_id, count in attended.items()
+        ]
+        return sorted(results, key=lambda result: (result[3], result[0]))
+
+    def student_percentage(self, subject, student_id):
+        sessions = self.session_count(subject)
+        row = self._query(
+            "SELECT attended FROM subject_student WHERE subject = ? AND student_id = ?",
+            (subject, str(student_id))
+        )
+        attended = row[0][0] if row else 0
+        return 100.0 * attended / sessions if sessions else 0.0
+
+    def chronic_absentees(self, subject, threshold=75.0, roster=None):
+        """Students whose attendance percentage is below threshold"""
+        return [
+            result for result in self.student_percentages(subject, roster)
+            if result[3] < threshold
+        ]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,110 @@
+"""Run an attendance session without the GUI
+
+    python attendance_cli.py CS101                      # default camera
+    python attendance_cli.py CS101 --source lecture.mp4
+    python attendance_cli.py CS101 --source frames/ --detector lbp
+    python attendance_cli.py CS101 --source 0 --source 1 --source 2
+"""
+import argparse
+import time
+
+import config
+import metrics
+from engine import REQUIRED_VOTES, AttendanceEngine
+
+
+def print_stats(stats):
+    print(f"Frames: {stats['frames_captured']} captured {stats['frames_captured_per_camera']}, {stats['frames_processed']} processed "
+          f"{stats['frames_processed_per_camera']}, "
+          f"{stats['frames_dropped']} dropped")
+    print(f"Throughput: {stats['fps']:.1f} frames/s over {stats['elapsed']:.1f}s, "
+          f"mean capture-to-result latency {stats['mean_latency_ms']:.1f} ms")
+
+
+def take_attendance(engine, args, parser):
+    """Run one session for the parsed arguments and print its results"""
+    if args.subject not in engine.subjects_db:
+        parser.error(f"Unknown subject: {args.subject}")
+    if args.detector:
+        engine.set_detector(args.detector)
+    if args.rebuild:
+        engine.rebuild_model()
+    else:
+        engine.ensure_model_current()
+    if not engine.has_model():
+        parser.error("No trained model found. Please register students first.")
+
+    timeout = args.timeout * 60 if args.timeout else None
+    sources = args.source or config.CAMERAS['sources']
+    session = engine.start_session(args.subject, sources, timeout, args.votes, args.workers,
+                                   args.rule, args.record, args.processes)
+    print(f"Taking attendance for {args.subject} from {len(sources)} source(s) ({len(session.roster)} students, "
+          f"{session.marked_count()} already marked today)")
+
+    last_stats = time.monotonic()
+    reported = 0
+
+    def on_frame(frame):
+        nonlocal last_stats, reported
+        for student_id, name in session.newly_marked[reported:]:
+            print(f"Marked {student_id} {name}")
+        reported = len(session.newly_marked)
+        if args.stats_interval and time.monotonic() - last_stats >= args.stats_interval:
+            last_stats = time.monotonic()
+            print_stats(session.stats())
+            print(metrics.registry.overlay_text())
+
+    try:
+        end_reason = session.run(on_frame=on_frame)
+    except KeyboardInterrupt:
+        end_reason = "Session stopped"
+    finally:
+        session.close()
+
+    print(f"{end_reason}. Marked {len(session.newly_marked)} students this session "
+          f"({session.marked_count()}/{len(session.roster)} of the roster today).")
+    print_stats(session.stats())
+    print(metrics.registry.overlay_text())
+    time_to_mark, _ = metrics.registry.stage('time_to_mark')
+    if time_to_mark:
+        print(f"Median time from first recognition to mark: {time_to_mark:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take attendance for a subject without the GUI")
+    parser.add_argument("subject", help="Subject code")
+    parser.add_argument("--source", action="append",
+                        help="Camera index, video file or directory of images; repeat for several "
+                             "cameras (default: config.CAMERAS)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processing threads shared by all sources")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Recognition worker processes, 0 to predict in-process (default: config.RECOGNITION)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Stop after this many minutes (default: until the input ends)")
+    parser.add_argument("--votes", type=int, default=REQUIRED_VOTES,
+                        help="Confirmed frames needed before a student is marked with --rule votes")
+    parser.add_argument("--rule", choices=["sequential", "votes"],
+                        help="Decision rule, overrides config.DECISION")
+    parser.add_argument("--record", metavar="CSV",
+                        help="Write tracker events for benchmarks/replay_decisions.py")
+    parser.add_argument("--detector", help="Face detector backend, overrides config.DETECTION")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Retrain the model from every stored face sample first")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="Print throughput every N seconds while running")
+    args = parser.parse_args()
+
+    engine = AttendanceEngine()
+    # Cached recognition pools hold worker processes and shared memory, so
+    # close the engine however the run ends
+    try:
+        take_attendance(engine, args, parser)
+    finally:
+        engine.close()
+        if engine.metrics_exporter:
+            engine.metrics_exporter.stop()  # Final snapshot
+
+
+if __name__ == "__main__":
+    main()
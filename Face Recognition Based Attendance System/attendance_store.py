@@ -0,0 +1,228 @@
+import csv
+import os
+import sqlite3
+import threading
+import time as time_module
+from datetime import datetime
+
+CSV_COLUMNS = ['Student ID', 'Name', 'Time']
+
+
+def attendance_filename(directory, subject, date):
+    return os.path.join(directory, f"{subject}_{date}.csv")
+
+
+def now():
+    """Current (date, time) strings in the attendance file format"""
+    current = datetime.now()
+    return current.strftime("%Y-%m-%d"), current.strftime("%H:%M:%S")
+
+
+class CsvAttendanceStore:
+    """Appends one row per mark to attendance/{subject}_{date}.csv
+
+    Students already marked are remembered in memory per (subject, date), so
+    marking never re-reads or rewrites the file.
+    """
+
+    name = 'csv'
+
+    def __init__(self, directory="attendance", **settings):
+        self.directory = directory
+        self.marked_cache = {}
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def marked(self, subject, date):
+        """Set of student IDs already marked for a subject on a date"""
+        with self.lock:
+            return set(self._marked(subject, date))
+
+    def _marked(self, subject, date):
+        key = (subject, date)
+        if key not in self.marked_cache:
+            self.marked_cache[key] = {row[0] for row in self.records(subject, date)}
+        return self.marked_cache[key]
+
+    def mark(self, subject, student_id, name, date=None, time=None):
+        """Record attendance; returns False if the student was already marked"""
+        if date is None or time is None:
+            current_date, current_time = now()
+            date, time = date or current_date, time or current_time
+        student_id = str(student_id)
+        with self.lock:
+            marked = self._marked(subject, date)
+            if student_id in marked:
+                return False
+
+            filename = attendance_filename(self.directory, subject, date)
+            write_header = not os.path.exists(filename) or os.path.getsize(filename) == 0
+            with open(filename, 'a', newline='') as f:
+                writer = csv.writer(f, lineterminator='\n')
+                if write_header:
+                    writer.writerow(CSV_COLUMNS)
+                writer.writerow([student_id, name, time])
+            marked.add(student_id)
+            return True
+
+    def records(self, subject, date):
+        """[(student_id, name, time)] in the order they were marked"""
+        filename = attendance_filename(self.directory, subject, date)
+        if not os.path.exists(filename):
+            return []
+        with open(filename, newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Header
+            return [tuple(row[:3]) for row in reader if row]
+
+    def export_csv(self, subject, date, path=None):
+        """The CSV store already writes the export layout; copy it if another path is given"""
+        filename = attendance_filename(self.directory, subject, date)
+        if path is None or os.path.abspath(path) == os.path.abspath(filename):
+            return filename
+        write_csv(path, self.records(subject, date))
+        return path
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SqliteAttendanceStore:
+    """Attendance rows in SQLite with a unique (subject, date, student_id) index
+
+    Runs in WAL mode and commits in batches of commit_every marks, or after
+    commit_interval seconds, whichever comes first. Call flush() at the end of
+    a session.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, database="attendance.db", directory="attendance",
+                 commit_every=10, commit_interval=2.0, **settings):
+        self.directory = directory
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self.last_commit = time_module.monotonic()
+        self.lock = threading.Lock()
+        new_database = not os.path.exists(database)
+        self.conn = sqlite3.connect(database, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS attendance ("
+            " subject TEXT NOT NULL, date TEXT NOT NULL, student_id TEXT NOT NULL,"
+            " name TEXT, time TEXT)"
+        )
+        self.conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS attendance_unique"
+            " ON attendance (subject, date, student_id)"
+        )
+        self.conn.commit()
+        # Carry over the existing CSV history the first time the database is created
+        if new_database and os.path.isdir(directory):
+            self.import_csv(directory)
+
+    def marked(self, subject, date):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT student_id FROM attendance WHERE subject = ? AND date = ?",
+                (subject, date)
+            )
+            return {row[0] for row in rows}
+
+    def mark(self, subject, student_id, name, date=None, time=None):
+        """Record attendance; returns False if the student was already marked"""
+        if date is None or time is None:
+            current_date, current_time = now()
+            date, time = date or current_date, time or current_time
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO attendance (subject, date, student_id, name, time)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (subject, date, str(student_id), name, time)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self.pending += 1
+            if (self.pending >= self.commit_every
+                    or time_module.monotonic() - self.last_commit >= self.commit_interval):
+                self._commit()
+            return True
+
+    def records(self, subject, date):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT student_id, name, time FROM attendance"
+                " WHERE subject = ? AND date = ? ORDER BY rowid",
+                (subject, date)
+            ).fetchall()
+
+    def rows_after(self, rowid):
+        """[(rowid, subject, date, student_id)] added after a rowid watermark"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT rowid, subject, date, student_id FROM attendance"
+                " WHERE rowid > ? ORDER BY rowid", (rowid,)
+            ).fetchall()
+
+    def export_csv(self, subject, date, path=None):
+        """Write one subject/date in the attendance/{subject}_{date}.csv layout"""
+        self.flush()
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = attendance_filename(self.directory, subject, date)
+        write_csv(path, self.records(subject, date))
+        return path
+
+    def import_csv(self, directory="attendance"):
+        """Load existing attendance/{subject}_{date}.csv files; returns rows added"""
+        added = 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".csv") or "_" not in filename:
+                continue
+            subject, date = filename[:-4].rsplit("_", 1)
+            with open(os.path.join(directory, filename), newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    if row and self.mark(subject, row[0], row[1], date, row[2]):
+                        added += 1
+        self.flush()
+        return added
+
+    def _commit(self):
+        self.conn.commit()
+        self.pending = 0
+        self.last_commit = time_module.monotonic()
+
+    def flush(self):
+        with self.lock:
+            if self.pending:
+                self._commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def write_csv(path, records):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(records)
+
+
+BACKENDS = {store.name: store for store in (CsvAttendanceStore, SqliteAttendanceStore)}
+
+
+def create_store(settings):
+    """Create the attendance store named by settings['backend']"""
+    settings = dict(settings)
+    backend = settings.pop('backend', 'csv')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown attendance store: {backend}")
+    return BACKENDS[backend](**settings)
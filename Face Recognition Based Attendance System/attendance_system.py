@@ -1,57 +1,23 @@
 import cv2
-import os
-import numpy as np
-import pandas as pd
-from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
 import ttkthemes  # You'll need to install this: pip install ttkthemes
+import config
+import metrics
+from datetime import datetime
+from display import CanvasDisplay, tile_frames
+from detection import available_backends
+from engine import AttendanceEngine, annotate_frame
+from virtual_table import VirtualTable
 
 class AttendanceSystem:
-    def __init__(self):
-        # Initialize face recognition components
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        
-        # Setup directories and database
-        self.setup_directories()
-        self.db_file = "student_database.csv"
-        if not os.path.exists(self.db_file):
-            pd.DataFrame(columns=['ID', 'Name']).to_csv(self.db_file, index=False)
-        
-        self.student_db = self.load_student_database()
-        
+    def __init__(self, engine=None):
+        # Training, detection, recognition and marking live in the GUI-free engine
+        self.engine = engine or AttendanceEngine()
+        self.session = None  # Running AttendanceSession, if any
+
         # Initialize GUI
         self.setup_gui()
-        
-    def setup_directories(self):
-        """Create necessary directories if they don't exist"""
-        for dir_name in ["student_images", "attendance", "trainer"]:
-            if not os.path.exists(dir_name):
-                os.makedirs(dir_name)
-        
-        # Load trained model if exists
-        self.model_path = "trainer/face_model.yml"
-        if os.path.exists(self.model_path):
-            try:
-                self.recognizer.read(self.model_path)
-                # Retrain the model when starting the program to ensure accuracy
-                self.train_recognizer()
-            except:
-                # If there's any error loading the model, retrain it
-                self.train_recognizer()
-    
-    def load_student_database(self):
-        """Load student information from CSV"""
-        student_db = {}
-        if os.path.exists(self.db_file):
-            df = pd.read_csv(self.db_file)
-            for _, row in df.iterrows():
-                student_db[str(row['ID'])] = row['Name']
-        return student_db
 
     def setup_gui(self):
         """Setup the main GUI window with modern styling"""
@@ -114,12 +80,6 @@ class AttendanceSystem:
         self.style.configure('Header.TLabel', background='#EDF2F7')
         self.style.configure('Camera.TLabelframe', background='#FFFFFF')
         
-        # Initialize subjects database BEFORE setting up tabs
-        self.subjects_file = "subjects_database.csv"
-        if not os.path.exists(self.subjects_file):
-            pd.DataFrame(columns=['Subject Code', 'Subject Name']).to_csv(self.subjects_file, index=False)
-        self.subjects_db = self.load_subjects_database()
-
         # Initialize admin credentials
         self.admin_credentials = {
             "admin": "password123"  # You can change this default username/password
@@ -214,6 +174,15 @@ class AttendanceSystem:
         )
         retrain_btn.pack(side='left', fill='x', expand=True, padx=(5, 0))
 
+        # Full rebuild button (registration and retraining only update the model)
+        rebuild_btn = ttk.Button(
+            btn_frame,
+            text="Rebuild Model",
+            command=self.rebuild_model,
+            style='Accent.TButton'
+        )
+        rebuild_btn.pack(fill='x', pady=(10, 0))
+
         # Camera feed frame with white background - matching attendance tab
         camera_frame = ttk.LabelFrame(
             self.register_tab, 
@@ -232,6 +201,7 @@ class AttendanceSystem:
             highlightbackground='#E2E8F0'  # Light gray border
         )
         self.register_canvas.pack(padx=10, pady=10)
+        self.register_canvas.display = CanvasDisplay(self.register_canvas, config.DISPLAY['max_fps'])
 
         # Status label with custom styling
         self.register_status_label = ttk.Label(
@@ -295,6 +265,40 @@ class AttendanceSystem:
         # Add spacing between items
         self.root.option_add('*TCombobox*Listbox.spacing', 2)
         
+        # Session timeout in minutes
+        ttk.Label(
+            subject_frame, 
+            text="Session timeout (minutes):", 
+            font=('Helvetica', 11, 'bold'),
+            foreground='#2C3E50'
+        ).pack(anchor='w', pady=5)
+        self.session_timeout_var = tk.IntVar(value=15)
+        ttk.Spinbox(
+            subject_frame,
+            from_=1,
+            to=180,
+            textvariable=self.session_timeout_var,
+            width=10
+        ).pack(anchor='w', pady=5)
+
+        # Face detector backend (only those whose model files are present)
+        ttk.Label(
+            subject_frame, 
+            text="Face detector:", 
+            font=('Helvetica', 11, 'bold'),
+            foreground='#2C3E50'
+        ).pack(anchor='w', pady=5)
+        self.detector_var = tk.StringVar(value=self.engine.face_detector.name)
+        detector_combo = ttk.Combobox(
+            subject_frame,
+            textvariable=self.detector_var,
+            values=available_backends(config.DETECTION),
+            state='readonly',
+            width=10
+        )
+        detector_combo.pack(anchor='w', pady=5)
+        detector_combo.bind('<<ComboboxSelected>>', self.on_detector_change)
+
         # Bind tab selection to update subjects
         self.tab_control.bind('<<NotebookTabChanged>>', self.on_tab_change)
         
@@ -313,6 +317,14 @@ class AttendanceSystem:
         )
         start_btn.pack(fill='x')
 
+        stop_btn = ttk.Button(
+            btn_frame,
+            text="Stop Attendance",
+            command=self.stop_attendance,
+            style='Accent.TButton'
+        )
+        stop_btn.pack(fill='x', pady=(10, 0))
+
         # Camera feed frame with white background
         camera_frame = ttk.LabelFrame(
             self.attendance_tab, 
@@ -331,6 +343,7 @@ class AttendanceSystem:
             highlightbackground='#E2E8F0'  # Light gray border
         )
         self.attendance_canvas.pack(padx=10, pady=10)
+        self.attendance_canvas.display = CanvasDisplay(self.attendance_canvas, config.DISPLAY['max_fps'])
 
         # Status label with custom styling
         self.status_label = ttk.Label(
@@ -386,6 +399,40 @@ class AttendanceSystem:
         )
         add_btn.pack(fill='x', pady=10)
 
+        # Enrollment input frame
+        enroll_frame = ttk.LabelFrame(
+            input_frame,
+            text="Enroll Students",
+            padding=15,
+            style='Info.TLabelframe'
+        )
+        enroll_frame.pack(fill='x', pady=5)
+
+        ttk.Label(
+            enroll_frame,
+            text="Student IDs (comma separated):",
+            font=('Helvetica', 11, 'bold'),
+            foreground='#2C3E50'
+        ).pack(anchor='w', pady=5)
+        self.enroll_ids_var = tk.StringVar()
+        ttk.Entry(enroll_frame, textvariable=self.enroll_ids_var, width=30).pack(fill='x', pady=5)
+
+        enroll_btn = ttk.Button(
+            enroll_frame,
+            text="Enroll in Selected Subject",
+            command=self.enroll_students,
+            style='Accent.TButton'
+        )
+        enroll_btn.pack(fill='x', pady=(10, 5))
+
+        unenroll_btn = ttk.Button(
+            enroll_frame,
+            text="Remove from Selected Subject",
+            command=self.unenroll_students,
+            style='Accent.TButton'
+        )
+        unenroll_btn.pack(fill='x', pady=5)
+
         # Subjects List
         list_frame = ttk.LabelFrame(
             self.subjects_tab,
@@ -396,15 +443,24 @@ class AttendanceSystem:
         list_frame.pack(side='right', padx=20, pady=20, fill='both', expand=True)
 
         # Create Treeview for subjects list
-        columns = ('Subject Code', 'Subject Name')
-        self.subjects_tree = ttk.Treeview(list_frame, columns=columns, show='headings')
+        columns = ('Subject Code', 'Subject Name', 'Enrolled')
+        tree_frame = ttk.Frame(list_frame)
+        tree_frame.pack(fill='both', expand=True)
+        self.subjects_tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
         
         # Set column headings
         for col in columns:
             self.subjects_tree.heading(col, text=col)
             self.subjects_tree.column(col, width=150)
 
-        self.subjects_tree.pack(fill='both', expand=True)
+        # Only the visible rows are Treeview items; the table refills them as it scrolls
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical')
+        self.subjects_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        self.subjects_table = VirtualTable(
+            self.subjects_tree, scrollbar, ('code', 'name'),
+            lambda position, row: (row[0], row[1], len(self.engine.subject_rosters.get(row[0], ())))
+        )
 
         # Delete button
         delete_btn = ttk.Button(
@@ -491,25 +547,37 @@ class AttendanceSystem:
         self.records_tree.column('Time', width=100)
 
         # Add scrollbar
-        scrollbar = ttk.Scrollbar(records_frame, orient='vertical', command=self.records_tree.yview)
-        self.records_tree.configure(yscrollcommand=scrollbar.set)
-        
+        scrollbar = ttk.Scrollbar(records_frame, orient='vertical')
+
         # Pack the treeview and scrollbar
         self.records_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
+        self.records_table = VirtualTable(
+            self.records_tree, scrollbar, ('id', 'name', 'time'),
+            lambda position, row: (position,) + row
+        )
+
+        # Export button (writes attendance/{subject}_{date}.csv)
+        self.records_subject = None
+        export_btn = ttk.Button(
+            right_frame,
+            text="Export CSV",
+            command=self.export_attendance_records,
+            style='Accent.TButton'
+        )
+        export_btn.pack(side='left', expand=True, pady=10)
+
+        stats_btn = ttk.Button(
+            right_frame,
+            text="Attendance Statistics",
+            command=self.show_subject_statistics,
+            style='Accent.TButton'
+        )
+        stats_btn.pack(side='left', expand=True, pady=10)
 
         # Update subjects list
         self.update_subjects_list()
 
-    def load_subjects_database(self):
-        """Load subjects from CSV"""
-        subjects_db = {}
-        if os.path.exists(self.subjects_file):
-            df = pd.read_csv(self.subjects_file)
-            for _, row in df.iterrows():
-                subjects_db[str(row['Subject Code'])] = row['Subject Name']
-        return subjects_db
-
     def add_subject(self):
         """Add a new subject to the database"""
         code = self.subject_code_var.get().strip()
@@ -519,18 +587,17 @@ class AttendanceSystem:
             messagebox.showerror("Error", "Please enter both Subject Code and Name")
             return
 
-        if code in self.subjects_db:
+        if code in self.engine.subjects_db:
             messagebox.showerror("Error", "Subject Code already exists")
             return
 
         # Update database
-        df = pd.read_csv(self.subjects_file)
-        new_row = pd.DataFrame([{'Subject Code': code, 'Subject Name': name}])
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(self.subjects_file, index=False)
+        if not self.engine.registry.add_subject(code, name):
+            messagebox.showerror("Error", "Subject Code already exists")
+            return
 
-        self.subjects_db[code] = name
-        self.refresh_subjects_list()
+        self.engine.subjects_db[code] = name
+        self.subjects_table.append_row((code, name))
         self.update_subject_choices()
         self.update_subjects_list()
 
@@ -542,37 +609,78 @@ class AttendanceSystem:
 
     def delete_subject(self):
         """Delete selected subject"""
-        selected_item = self.subjects_tree.selection()
-        if not selected_item:
+        selected_row = self.subjects_table.selected_row()
+        if selected_row is None:
             messagebox.showerror("Error", "Please select a subject to delete")
             return
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this subject?"):
-            subject_code = self.subjects_tree.item(selected_item)['values'][0]
-            
-            # Update database
-            df = pd.read_csv(self.subjects_file)
-            df = df[df['Subject Code'] != str(subject_code)]
-            df.to_csv(self.subjects_file, index=False)
+            subject_code = selected_row[0]
 
-            del self.subjects_db[str(subject_code)]
-            self.refresh_subjects_list()
+            # Update database (enrollment is removed along with the subject)
+            self.engine.registry.delete_subject(subject_code)
+
+            del self.engine.subjects_db[subject_code]
+            self.engine.subject_rosters.pop(subject_code, None)
+            self.engine.subject_models.invalidate(subject_code)
+            self.subjects_table.remove_row(subject_code)
             self.update_subject_choices()
             self.update_subjects_list()
             messagebox.showinfo("Success", "Subject deleted successfully!")
 
+    def selected_enrollment(self):
+        """Return (subject code, student IDs) from the subjects tab, or None"""
+        selected_row = self.subjects_table.selected_row()
+        if selected_row is None:
+            messagebox.showerror("Error", "Please select a subject")
+            return None
+
+        student_ids = {
+            student_id.strip() for student_id in self.enroll_ids_var.get().split(",")
+            if student_id.strip()
+        }
+        if not student_ids:
+            messagebox.showerror("Error", "Please enter at least one Student ID")
+            return None
+
+        unknown = sorted(student_ids - set(self.engine.student_db))
+        if unknown:
+            messagebox.showerror("Error", f"Unknown Student ID(s): {', '.join(unknown)}")
+            return None
+
+        return selected_row[0], student_ids
+
+    def enroll_students(self):
+        """Add students to the selected subject's roster"""
+        selection = self.selected_enrollment()
+        if selection is None:
+            return
+        subject_code, student_ids = selection
+        self.engine.registry.enroll(subject_code, student_ids)
+        self.engine.reload_subject_roster(subject_code)
+        self.enroll_ids_var.set("")
+        self.subjects_table.render()  # Enrolled counts changed
+        messagebox.showinfo("Success", f"Enrolled {len(student_ids)} students in {subject_code}")
+
+    def unenroll_students(self):
+        """Remove students from the selected subject's roster"""
+        selection = self.selected_enrollment()
+        if selection is None:
+            return
+        subject_code, student_ids = selection
+        self.engine.registry.unenroll(subject_code, student_ids)
+        self.engine.reload_subject_roster(subject_code)
+        self.enroll_ids_var.set("")
+        self.subjects_table.render()  # Enrolled counts changed
+        messagebox.showinfo("Success", f"Removed {len(student_ids)} students from {subject_code}")
+
     def refresh_subjects_list(self):
         """Refresh the subjects list in the treeview"""
-        for item in self.subjects_tree.get_children():
-            self.subjects_tree.delete(item)
-        
-        df = pd.read_csv(self.subjects_file)
-        for _, row in df.iterrows():
-            self.subjects_tree.insert('', 'end', values=(row['Subject Code'], row['Subject Name']))
+        self.subjects_table.set_rows(list(self.engine.subjects_db.items()))
 
     def update_subject_choices(self):
         """Update the subject choices in the attendance tab"""
-        subjects = [f"{code} - {name}" for code, name in self.subjects_db.items()]
+        subjects = [f"{code} - {name}" for code, name in self.engine.subjects_db.items()]
         # Add extra spaces to create visual separation between items
         formatted_subjects = ["Please Choose Subject"] + [f"{subject}\n" for subject in subjects]
         self.subject_combo['values'] = formatted_subjects
@@ -589,56 +697,53 @@ class AttendanceSystem:
 
         self.register_student(student_id, name)
 
-    def register_student(self, student_id, name):
-        """Register a new student"""
+    def capture_samples(self, student_id, name):
+        """Capture sharp, varied face samples from the camera; returns the accepted faces"""
         cap = cv2.VideoCapture(0)
-        face_samples = 0
-        max_samples = 20  # Changed from 5 to 20 photos
+        capture = self.engine.start_sample_capture(student_id)
 
         self.register_status_label.config(text="Please move your face in different positions and angles...")
 
-        while face_samples < max_samples:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
-            for (x, y, w, h) in faces:
-                face = gray[y:y+h, x:x+w]
-                face = cv2.resize(face, (200, 200))
-                
-                # Save face image
-                img_name = f"student_images/{student_id}_{name}_{face_samples}.jpg"
-                cv2.imwrite(img_name, face)
-                
-                face_samples += 1
-                
-                # Draw rectangle around face
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                cv2.putText(frame, f"Captured: {face_samples}/{max_samples}", 
-                          (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-                # Add a small delay to allow time for position changes
-                cv2.waitKey(100)
-
-            # Update GUI
-            self.update_camera_feed(frame, self.register_canvas)
-            self.register_status_label.config(text=f"Capturing images: {face_samples}/{max_samples}")
-            self.root.update()
+        try:
+            while not capture.done:
+                ret, frame = cap.read()
+                if not ret:
+                    break
 
-        cap.release()
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                offered = capture.offer(self.engine.extract_faces(gray))
+                if offered:
+                    (x, y, w, h), accepted = offered
+                    # Green for a kept sample, orange for a blurry or repeated one
+                    color = (0, 255, 0) if accepted else (0, 165, 255)
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                    cv2.putText(frame, f"Captured: {len(capture.faces)}/{capture.max_samples}",
+                                (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
-        # Update database
-        df = pd.read_csv(self.db_file) if os.path.exists(self.db_file) else pd.DataFrame(columns=['ID', 'Name'])
-        new_row = pd.DataFrame([{'ID': student_id, 'Name': name}])
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(self.db_file, index=False)
-        
-        self.student_db[student_id] = name
-        self.train_recognizer()
-        self.refresh_students_list()
+                # Update GUI
+                self.update_camera_feed(frame, self.register_canvas)
+                self.register_status_label.config(text=capture.status())
+                self.root.update()
+        finally:
+            cap.release()
+            # The model signature counts stored samples, so wait for pending writes
+            faces = capture.finish()
+        return faces
+
+    def register_student(self, student_id, name):
+        """Register a new student"""
+        captured_faces = self.capture_samples(student_id, name)
+        if not captured_faces:
+            self.register_status_label.config(text="No usable face samples captured")
+            messagebox.showerror("Error", "No usable face samples were captured. Please try again.")
+            return
+
+        # Update database and feed only the new samples into the existing model
+        if self.engine.register_student(student_id, name, captured_faces):
+            self.students_table.append_row((student_id, name))
+            self.update_student_count()
+        else:
+            self.refresh_students_list()
         
         self.register_status_label.config(text="Registration completed successfully!")
         messagebox.showinfo("Success", "Registration completed successfully!")
@@ -653,174 +758,91 @@ class AttendanceSystem:
         # Extract subject code from the selection
         subject_code = subject.split(' - ')[0]
 
-        if not os.path.exists(self.model_path):
+        if not self.engine.has_model():
             messagebox.showerror("Error", "No trained model found. Please register students first.")
             return
 
+        if self.session is not None:
+            messagebox.showerror("Error", "An attendance session is already running")
+            return
+
         self.take_attendance(subject_code)
 
-    def take_attendance(self, subject):
-        """Take attendance for a subject"""
-        # Retrain the model before taking attendance to ensure accuracy
-        self.train_recognizer()
-        
-        cap = cv2.VideoCapture(0)
-        recognition_counts = {}
-        attendance_marked = set()
-        required_recognitions = 20  # Increased from 5 to 20 for better accuracy
-        
+    def on_detector_change(self, event):
+        """Switch the face detector backend"""
+        backend = self.detector_var.get()
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            self.engine.set_detector(backend)
+        except (FileNotFoundError, ValueError, cv2.error) as e:
+            messagebox.showerror("Error", f"Could not load {backend} detector: {e}")
+            self.detector_var.set(self.engine.face_detector.name)
 
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
-                for (x, y, w, h) in faces:
-                    face = gray[y:y+h, x:x+w]
-                    face = cv2.resize(face, (200, 200))
-
-                    try:
-                        student_id, confidence = self.recognizer.predict(face)
-                        student_id = str(student_id)
-
-                        if confidence < 65:  # Decreased threshold for stricter matching
-                            name = self.student_db.get(student_id, "Unknown")
-                            
-                            if student_id not in recognition_counts:
-                                recognition_counts[student_id] = 0
-                            recognition_counts[student_id] += 1
-                            
-                            if recognition_counts[student_id] >= required_recognitions and student_id not in attendance_marked:
-                                self.mark_attendance(subject, student_id, name)
-                                attendance_marked.add(student_id)
-                                color = (0, 255, 0)  # Green for marked
-                                label = f"{name} (Marked)"
-                                
-                                # Show success message and break the loop
-                                messagebox.showinfo("Success", f"Attendance marked for {name}")
-                                return
-                            else:
-                                color = (255, 165, 0)  # Orange for recognizing
-                                label = f"{name} [{recognition_counts[student_id]}/{required_recognitions}]"
-                        else:
-                            color = (0, 0, 255)  # Red for unknown
-                            label = "Unknown"
-
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
-                        cv2.putText(frame, label, (x, y-10),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                    except:
-                        continue
+    def stop_attendance(self):
+        """Ask the running attendance session to finish"""
+        if self.session is not None:
+            self.session.stop()
 
-                # Update GUI
-                self.update_camera_feed(frame, self.attendance_canvas)
-                self.root.update()
+    def take_attendance(self, subject):
+        """Take attendance for a subject until stopped, timed out or everyone is marked"""
+        try:
+            timeout = max(1, int(self.session_timeout_var.get())) * 60
+        except (tk.TclError, ValueError):
+            timeout = 15 * 60
 
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+        # Capture and detection/recognition run in background threads;
+        # voting, marking and rendering stay on the Tk main thread
+        try:
+            session = self.engine.start_session(subject, config.CAMERAS['sources'], timeout)
+        except (IOError, FileNotFoundError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.session = session
 
-        finally:
-            cap.release()
-            self.attendance_canvas.delete("all")
+        latest_frames = {}  # Camera -> last annotated frame, tiled when there are several
 
-    def mark_attendance(self, subject, student_id, name):
-        """Record attendance in CSV file"""
-        try:
-            if not os.path.exists('attendance'):
-                os.makedirs('attendance')
-                
-            date = datetime.now().strftime("%Y-%m-%d")
-            time = datetime.now().strftime("%H:%M:%S")
-            
-            filename = f"attendance/{subject}_{date}.csv"
-            
-            if not os.path.exists(filename):
-                df = pd.DataFrame(columns=['Student ID', 'Name', 'Time'])
+        def show_frame(frame):
+            annotate_frame(frame.image, frame.faces)
+            latest_frames[frame.camera] = frame.image
+            if len(latest_frames) > 1:
+                image = tile_frames([latest_frames[camera] for camera in sorted(latest_frames)])
             else:
-                df = pd.read_csv(filename)
-            
-            if not df[(df['Student ID'] == str(student_id))].empty:
-                return
-            
-            new_row = pd.DataFrame([{
-                'Student ID': str(student_id),
-                'Name': name,
-                'Time': time
-            }])
-            
-            df = pd.concat([df, new_row], ignore_index=True)
-            df.to_csv(filename, index=False)
-            
-        except Exception as e:
-            print(f"Error marking attendance: {e}")
+                image = frame.image
+            self.update_camera_feed(image, self.attendance_canvas)
+            if config.METRICS['overlay']:
+                self.attendance_canvas.display.set_overlay(metrics.registry.overlay_text())
+            stats = session.stats()
+            last_marked = f" | last: {session.newly_marked[-1][1]}" if session.newly_marked else ""
+            self.status_label.config(
+                text=f"Marked {session.marked_count()}/{len(session.roster)}{last_marked} | "
+                     f"queues: capture {stats['queue_capture']}, render {stats['queue_render']}"
+            )
+            self.root.update()
 
-    def train_recognizer(self):
-        """Train the face recognizer"""
-        faces = []
-        ids = []
-        
-        # Load all training images
-        for img_file in os.listdir("student_images"):
-            if img_file.endswith(".jpg"):
-                img_path = os.path.join("student_images", img_file)
-                face_img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-                student_id = int(img_file.split("_")[0])
-                
-                if face_img is not None:  # Check if image was loaded successfully
-                    face_img = cv2.resize(face_img, (200, 200))
-                    faces.append(face_img)
-                    ids.append(student_id)
-        
-        if faces:  # Only train if there are faces
-            try:
-                # Convert ids to numpy array
-                ids = np.array(ids)
-                
-                # Train the recognizer
-                self.recognizer.train(faces, ids)
-                
-                # Save the model
-                self.recognizer.save(self.model_path)
-                print("Model trained and saved successfully")
-            except Exception as e:
-                print(f"Error training model: {e}")
-                # If training fails, try to delete the model file and train again
-                if os.path.exists(self.model_path):
-                    os.remove(self.model_path)
-                self.recognizer = cv2.face.LBPHFaceRecognizer_create()
-                self.recognizer.train(faces, ids)
-                self.recognizer.save(self.model_path)
+        try:
+            end_reason = session.run(on_frame=show_frame, on_idle=self.root.update)
+        finally:
+            session.close()
+            self.session = None
+            self.attendance_canvas.display.clear()
+
+        marked = len(session.newly_marked)
+        self.status_label.config(text=f"{end_reason}. Marked {marked} students this session.")
+        messagebox.showinfo(
+            "Attendance Session",
+            f"{end_reason}.\nAttendance marked for {marked} students this session."
+        )
+
+    def rebuild_model(self):
+        """Rebuild the recognizer from every stored face sample"""
+        self.register_status_label.config(text="Rebuilding model from all stored face samples...")
+        self.root.update()
+        self.engine.rebuild_model()
+        self.register_status_label.config(text="Model rebuilt successfully!")
+        messagebox.showinfo("Success", "Model rebuilt successfully!")
 
     def update_camera_feed(self, frame, canvas):
-        """Update camera feed with improved scaling"""
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = Image.fromarray(frame)
-        
-        # Scale to fit canvas while maintaining aspect ratio
-        canvas_width = canvas.winfo_width()
-        canvas_height = canvas.winfo_height()
-        
-        # Calculate scaling factor
-        scale_w = canvas_width / frame.width
-        scale_h = canvas_height / frame.height
-        scale = min(scale_w, scale_h)
-        
-        # Resize frame
-        new_width = int(frame.width * scale)
-        new_height = int(frame.height * scale)
-        frame = frame.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        frame = ImageTk.PhotoImage(image=frame)
-        canvas.create_image(
-            canvas_width//2,
-            canvas_height//2,
-            anchor=tk.CENTER,
-            image=frame
-        )
-        canvas.image = frame
+        """Draw a frame on the canvas, skipped if the preview rate cap was reached"""
+        canvas.display.show(frame)
 
     def start_retraining(self):
         """Start the retraining process"""
@@ -832,60 +854,28 @@ class AttendanceSystem:
             return
 
         # Verify student exists in database
-        if student_id not in self.student_db:
+        if student_id not in self.engine.student_db:
             messagebox.showerror("Error", "Student ID not found. Please register the student first.")
             return
 
         # Delete existing training images for this student
-        for img_file in os.listdir("student_images"):
-            if img_file.startswith(f"{student_id}_"):
-                os.remove(os.path.join("student_images", img_file))
+        self.engine.delete_face_samples(student_id)
 
         self.retrain_student(student_id, name)
 
     def retrain_student(self, student_id, name):
         """Retrain a student with new photos"""
-        cap = cv2.VideoCapture(0)
-        face_samples = 0
-        max_samples = 20  # Increased to 20 samples for better accuracy
-
-        self.register_status_label.config(text="Please move your face in different positions and angles...")
-
-        while face_samples < max_samples:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-
-            for (x, y, w, h) in faces:
-                face = gray[y:y+h, x:x+w]
-                face = cv2.resize(face, (200, 200))
-                
-                # Save face image
-                img_name = f"student_images/{student_id}_{name}_{face_samples}.jpg"
-                cv2.imwrite(img_name, face)
-                
-                face_samples += 1
-                
-                # Draw rectangle around face
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                cv2.putText(frame, f"Captured: {face_samples}/{max_samples}", 
-                          (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-            # Update GUI
-            self.update_camera_feed(frame, self.register_canvas)
-            self.register_status_label.config(text=f"Capturing images: {face_samples}/{max_samples}")
-            self.root.update()
-
-            # Add a small delay to allow time for position changes
-            cv2.waitKey(100)
-
-        cap.release()
+        captured_faces = self.capture_samples(student_id, name)
+        if not captured_faces:
+            self.register_status_label.config(text="No usable face samples captured")
+            messagebox.showerror("Error", "No usable face samples were captured. Please try again.")
+            return
 
-        # Retrain the recognizer
-        self.train_recognizer()
+        # The old samples are only flagged stale in the store, and an update
+        # can't take them out of the model, so retrain on the live samples
+        self.register_status_label.config(text="Retraining model...")
+        self.root.update()
+        self.engine.train_recognizer()
         
         self.register_status_label.config(text="Retraining completed successfully!")
         messagebox.showinfo("Success", "Student retraining completed successfully!")
@@ -911,7 +901,7 @@ class AttendanceSystem:
     def update_subjects_list(self):
         """Update the subjects list in the records tab"""
         self.subjects_listbox.delete(0, tk.END)
-        for code, name in self.subjects_db.items():
+        for code, name in self.engine.subjects_db.items():
             # Add the subject with a blank line after it for spacing
             self.subjects_listbox.insert(tk.END, f"{code} - {name}")
             self.subjects_listbox.insert(tk.END, "")  # Add empty line for spacing
@@ -925,11 +915,7 @@ class AttendanceSystem:
         # Get selected subject code
         subject_text = self.subjects_listbox.get(selection[0])
         subject_code = subject_text.split(' - ')[0]
-        
-        # Clear current records
-        for item in self.records_tree.get_children():
-            self.records_tree.delete(item)
-        
+
         # Load attendance records for selected subject
         self.load_attendance_records(subject_code)
 
@@ -938,11 +924,10 @@ class AttendanceSystem:
         # Get current date
         current_date = datetime.now().strftime("%Y-%m-%d")
         
-        # Create filename for current date
-        filename = f"attendance/{subject_code}_{current_date}.csv"
+        self.records_subject = subject_code
         
         # Update title with subject name and current date
-        subject_name = self.subjects_db.get(subject_code, "Unknown Subject")
+        subject_name = self.engine.subjects_db.get(subject_code, "Unknown Subject")
         
         # Format date for display (DD/MM/YYYY)
         try:
@@ -957,30 +942,95 @@ class AttendanceSystem:
             anchor='center'
         )
         
-        # Clear previous records
-        for item in self.records_tree.get_children():
-            self.records_tree.delete(item)
-        
-        # Load and display today's records if file exists
-        if os.path.exists(filename):
-            df = pd.read_csv(filename)
-            
-            # Add records with row numbers
-            for idx, row in enumerate(df.iterrows(), 1):
-                values = (
-                    idx,  # Row number
-                    row[1]['Student ID'],
-                    row[1]['Name'],
-                    row[1]['Time']
-                )
-                self.records_tree.insert('', 'end', values=values)
-        else:
+        # Load and display today's records if any were marked
+        self.engine.attendance_store.flush()
+        records = self.engine.attendance_store.records(subject_code, current_date)
+        self.records_table.set_rows([tuple(record) for record in records])
+        if not records:
             # If no attendance file exists for today
             self.records_title.config(
                 text=f"No attendance records for {subject_name} on {formatted_date}",
                 anchor='center'
             )
 
+    def export_attendance_records(self):
+        """Export today's records for the selected subject in the CSV layout"""
+        if not self.records_subject:
+            messagebox.showerror("Error", "Please select a subject")
+            return
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        path = self.engine.attendance_store.export_csv(self.records_subject, current_date)
+        messagebox.showinfo("Success", f"Attendance exported to {path}")
+
+    def show_subject_statistics(self):
+        """Show per-student percentages and per-session headcounts for the selected subject"""
+        if not self.records_subject:
+            messagebox.showerror("Error", "Please select a subject")
+            return
+
+        subject_code = self.records_subject
+        self.engine.analytics.refresh()
+        roster = self.engine.subject_rosters.get(subject_code)
+        threshold = config.ANALYTICS['chronic_threshold']
+        percentages = self.engine.analytics.student_percentages(subject_code, roster)
+        headcounts = self.engine.analytics.session_headcounts(subject_code)
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Attendance Statistics - {subject_code}")
+        dialog.geometry("700x500")
+        dialog.transient(self.root)
+
+        frame = ttk.Frame(dialog, padding="20")
+        frame.pack(fill='both', expand=True)
+
+        ttk.Label(
+            frame,
+            text=f"{self.engine.subjects_db.get(subject_code, subject_code)} - {len(headcounts)} sessions",
+            font=('Helvetica', 14, 'bold'),
+            foreground='#2C3E50'
+        ).pack(pady=(0, 10))
+
+        # Per-student attendance, lowest first; chronic absentees highlighted
+        students_frame = ttk.LabelFrame(
+            frame,
+            text=f"Students (below {threshold}% highlighted)",
+            padding=10,
+            style='Info.TLabelframe'
+        )
+        students_frame.pack(side='left', fill='both', expand=True, padx=(0, 10))
+
+        columns = ('Student ID', 'Name', 'Attended', 'Percent')
+        students_tree = ttk.Treeview(students_frame, columns=columns, show='headings')
+        for col, width in zip(columns, (80, 160, 70, 70)):
+            students_tree.heading(col, text=col)
+            students_tree.column(col, width=width, anchor='center')
+        students_tree.tag_configure('chronic', foreground='#C53030')
+        for student_id, attended, sessions, percent in percentages:
+            students_tree.insert('', 'end', values=(
+                student_id,
+                self.engine.student_db.get(student_id, "Unknown"),
+                f"{attended}/{sessions}",
+                f"{percent:.0f}%"
+            ), tags=('chronic',) if percent < threshold else ())
+        students_tree.pack(fill='both', expand=True)
+
+        # Per-session headcounts
+        sessions_frame = ttk.LabelFrame(
+            frame,
+            text="Sessions",
+            padding=10,
+            style='Info.TLabelframe'
+        )
+        sessions_frame.pack(side='right', fill='y')
+
+        sessions_tree = ttk.Treeview(sessions_frame, columns=('Date', 'Present'), show='headings')
+        for col in ('Date', 'Present'):
+            sessions_tree.heading(col, text=col)
+            sessions_tree.column(col, width=90, anchor='center')
+        for date, headcount in headcounts:
+            sessions_tree.insert('', 'end', values=(date, headcount))
+        sessions_tree.pack(fill='both', expand=True)
+
     def show_login_dialog(self):
         """Show login dialog and return True if authentication successful"""
         dialog = tk.Toplevel(self.root)
@@ -1151,6 +1201,14 @@ class AttendanceSystem:
         )
         self.student_count_label.pack(anchor='e', pady=(0, 10))  # Align right, add bottom padding
 
+        # Search by ID or name prefix
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill='x', pady=(0, 10))
+        ttk.Label(search_frame, text="Search ID or Name:", font=('Helvetica', 11)).pack(side='left')
+        self.student_search_var = tk.StringVar()
+        self.student_search_var.trace_add('write', lambda *args: self.filter_students())
+        ttk.Entry(search_frame, textvariable=self.student_search_var, width=30).pack(side='left', padx=10)
+
         # Create Treeview for students list
         columns = ('No', 'Student ID', 'Name')
         self.students_tree = ttk.Treeview(main_frame, columns=columns, show='headings')
@@ -1170,41 +1228,39 @@ class AttendanceSystem:
         self.students_tree.tag_configure('left_aligned', anchor='w')
 
         # Add scrollbar
-        scrollbar = ttk.Scrollbar(main_frame, orient='vertical', command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=scrollbar.set)
-        
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+
         # Pack the treeview and scrollbar
         self.students_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
+        # Only the visible rows are Treeview items; the table refills them as it scrolls
+        self.students_table = VirtualTable(
+            self.students_tree, scrollbar, ('id', 'name'),
+            lambda position, row: (position, row[0], f" {row[1]}"),  # Space for left padding
+            search_columns=(0, 1)
+        )
+
         # Load students
         self.refresh_students_list()
 
     def refresh_students_list(self):
         """Refresh the students list in the treeview"""
-        # Clear current items
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        # Load students from database
-        if os.path.exists(self.db_file):
-            df = pd.read_csv(self.db_file)
-            
-            # Add students with row numbers
-            for idx, row in enumerate(df.iterrows(), 1):
-                item = self.students_tree.insert('', 'end', values=(
-                    idx,  # Row number
-                    row[1]['ID'],
-                    row[1]['Name']
-                ))
-                
-                # Apply different alignments to each column
-                self.students_tree.set(item, 'No', idx)  # Center aligned by column
-                self.students_tree.set(item, 'Student ID', row[1]['ID'])  # Center aligned by column
-                self.students_tree.set(item, 'Name', f" {row[1]['Name']}")  # Added space for left padding
-            
-            # Update total count
-            self.student_count_label.config(text=f"Total: {len(df)} students")
+        self.students_table.set_rows(list(self.engine.student_db.items()))
+        self.update_student_count()
+
+    def filter_students(self):
+        """Show only students whose ID or name starts with the search text"""
+        self.students_table.filter(self.student_search_var.get())
+        self.update_student_count()
+
+    def update_student_count(self):
+        total = len(self.engine.student_db)
+        shown = self.students_table.count()
+        if shown == total:
+            self.student_count_label.config(text=f"Total: {total} students")
+        else:
+            self.student_count_label.config(text=f"Showing {shown} of {total} students")
 
     def setup_logout_tab(self):
         """Setup the logout tab"""
@@ -1237,6 +1293,8 @@ class AttendanceSystem:
         self.root.geometry(f"1024x768+{x}+{y}")
         
         self.root.mainloop()
+        # Stop the recognition workers kept between sessions
+        self.engine.close()
 
 if __name__ == "__main__":
     app = AttendanceSystem()
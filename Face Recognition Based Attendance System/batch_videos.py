@@ -0,0 +1,224 @@
+"""Take attendance from recorded lecture videos using every CPU core
+
+    python batch_videos.py CS-5307 lecture.mp4
+    python batch_videos.py --jobs tonight.csv --stride 5 --workers 8
+
+A jobs file has the columns video,subject and optionally date (YYYY-MM-DD)
+and start (HH:MM:SS, when the recording began). Each video is split into
+frame ranges that are processed in a process pool; the per-student votes
+are merged and written to attendance/{subject}_{date}.csv as usual.
+"""
+import argparse
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import cv2
+
+import config
+from detection import create_detector
+from engine import FACE_SIZE, REQUIRED_VOTES, AttendanceEngine
+from recognizers import create_recognizer
+
+# Loaded once per worker process by init_worker()
+worker_recognizer = None
+worker_detector = None
+
+
+def init_worker(model_path):
+    """Load the trained model and detector once for every chunk this process handles"""
+    global worker_recognizer, worker_detector
+    cv2.setNumThreads(1)  # One core per worker; the pool provides the parallelism
+    worker_recognizer = create_recognizer(config.RECOGNITION)
+    worker_recognizer.read(model_path)
+    worker_detector = create_detector(config.DETECTION)
+
+
+def process_chunk(job_index, video, start, end, stride, threshold):
+    """Count recognitions per student in frames [start, end) of a video
+
+    Returns (job_index, votes, first_seen, frames_processed, cpu_seconds),
+    where first_seen maps student IDs to the first frame they were seen in.
+    """
+    cpu_start = time.process_time()
+    votes = Counter()
+    first_seen = {}
+    processed = 0
+
+    cap = cv2.VideoCapture(video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    index = start
+    while index < end:
+        if (index - start) % stride:
+            # Skipped frames are only grabbed, not converted
+            if not cap.grab():
+                break
+            index += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        boxes = worker_detector.detect(gray)
+        faces = [cv2.resize(gray[y:y+h, x:x+w], FACE_SIZE) for x, y, w, h in boxes]
+        for student_id, confidence in worker_recognizer.predict_batch(faces):
+            if confidence < threshold:
+                student_id = str(student_id)
+                votes[student_id] += 1
+                first_seen.setdefault(student_id, index)
+        processed += 1
+        index += 1
+    cap.release()
+    return job_index, votes, first_seen, processed, time.process_time() - cpu_start
+
+
+def video_info(video):
+    """(frame count, fps) of a video file"""
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    return frames, fps
+
+
+def recording_start(video, frames, fps, date=None, start=None):
+    """When the recording began; defaults to the file's mtime minus its duration"""
+    default = datetime.fromtimestamp(os.path.getmtime(video)) - timedelta(seconds=frames / fps)
+    if date:
+        default = datetime.combine(datetime.strptime(date, "%Y-%m-%d").date(), default.time())
+    if start:
+        default = datetime.combine(default.date(), datetime.strptime(start, "%H:%M:%S").time())
+    return default
+
+
+def split_chunks(frames, chunk_frames, stride):
+    """Frame ranges of about chunk_frames, aligned to the stride"""
+    chunk_frames = max(stride, chunk_frames - chunk_frames % stride)
+    return [(start, min(start + chunk_frames, frames)) for start in range(0, frames, chunk_frames)]
+
+
+def load_jobs(path):
+    with open(path, newline='') as f:
+        return [
+            {'video': row['video'], 'subject': row['subject'],
+             'date': row.get('date') or None, 'start': row.get('start') or None}
+            for row in csv.DictReader(f)
+        ]
+
+
+def run_batch(engine, jobs, stride=5, workers=None, chunk_frames=600, min_votes=None):
+    """Process every job's video in a process pool and mark attendance
+
+    Returns (per-job results, stats). A student is marked when they were
+    recognized in at least min_votes sampled frames of the video.
+    """
+    workers = workers or os.cpu_count() or 1
+    if min_votes is None:
+        # REQUIRED_VOTES consecutive frames, thinned out by the stride
+        min_votes = max(2, REQUIRED_VOTES // stride)
+    threshold = config.RECOGNITION['threshold']
+
+    tasks = []
+    for job_index, job in enumerate(jobs):
+        frames, fps = video_info(job['video'])
+        job.update(frames=frames, fps=fps, votes=Counter(), first_seen={})
+        for start, end in split_chunks(frames, chunk_frames, stride):
+            tasks.append((job_index, job['video'], start, end, stride, threshold))
+
+    started = time.perf_counter()
+    frames_processed = 0
+    cpu_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(engine.model_path,)) as pool:
+        futures = [pool.submit(process_chunk, *task) for task in tasks]
+        for future in as_completed(futures):
+            job_index, votes, first_seen, processed, cpu = future.result()
+            job = jobs[job_index]
+            job['votes'].update(votes)
+            for student_id, frame_index in first_seen.items():
+                if frame_index < job['first_seen'].get(student_id, frame_index + 1):
+                    job['first_seen'][student_id] = frame_index
+            frames_processed += processed
+            cpu_seconds += cpu
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for job in jobs:
+        subject = job['subject']
+        began = recording_start(job['video'], job['frames'], job['fps'], job['date'], job['start'])
+        date = began.strftime("%Y-%m-%d")
+        roster = engine.subject_rosters.get(subject) or set(engine.student_db)
+        marked = []
+        for student_id, count in job['votes'].most_common():
+            if count < min_votes or student_id not in roster:
+                continue
+            seen_at = began + timedelta(seconds=job['first_seen'][student_id] / job['fps'])
+            name = engine.student_db.get(student_id, "Unknown")
+            if engine.attendance_store.mark(subject, student_id, name, date, seen_at.strftime("%H:%M:%S")):
+                marked.append((student_id, name))
+        path = engine.attendance_store.export_csv(subject, date)
+        results.append((job, marked, path))
+
+    stats = {
+        'videos': len(jobs),
+        'chunks': len(tasks),
+        'workers': workers,
+        'frames_processed': frames_processed,
+        'elapsed': elapsed,
+        'fps': frames_processed / elapsed if elapsed else 0.0,
+        'fps_per_core': frames_processed / elapsed / workers if elapsed else 0.0,
+        'fps_per_cpu_second': frames_processed / cpu_seconds if cpu_seconds else 0.0,
+    }
+    return results, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take attendance from recorded lecture videos")
+    parser.add_argument("subject", nargs="?", help="Subject code (with a single video)")
+    parser.add_argument("video", nargs="?", help="Video file (with a subject code)")
+    parser.add_argument("--jobs", help="CSV file with video,subject[,date,start] rows")
+    parser.add_argument("--date", help="Date of a single video, YYYY-MM-DD")
+    parser.add_argument("--start", help="Time a single video began, HH:MM:SS")
+    parser.add_argument("--stride", type=int, default=5, help="Process every Nth frame")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-frames", type=int, default=600, help="Frames per work item")
+    parser.add_argument("--min-votes", type=int, default=None,
+                        help="Sampled frames a student must be recognized in to be marked")
+    args = parser.parse_args()
+
+    if args.jobs:
+        jobs = load_jobs(args.jobs)
+    elif args.subject and args.video:
+        jobs = [{'video': args.video, 'subject': args.subject, 'date': args.date, 'start': args.start}]
+    else:
+        parser.error("Give a subject code and a video, or --jobs")
+
+    engine = AttendanceEngine()
+    for job in jobs:
+        if job['subject'] not in engine.subjects_db:
+            parser.error(f"Unknown subject: {job['subject']}")
+    engine.ensure_model_current()
+    if not engine.has_model():
+        parser.error("No trained model found. Please register students first.")
+
+    results, stats = run_batch(engine, jobs, max(1, args.stride), args.workers,
+                               args.chunk_frames, args.min_votes)
+    engine.attendance_store.flush()
+
+    for job, marked, path in results:
+        print(f"{job['video']}: {job['subject']}, marked {len(marked)} students -> {path}")
+        for student_id, name in marked:
+            print(f"  {student_id} {name} ({job['votes'][student_id]} frames)")
+    print(f"Processed {stats['frames_processed']} frames from {stats['videos']} videos "
+          f"in {stats['chunks']} chunks with {stats['workers']} workers in {stats['elapsed']:.1f}s")
+    print(f"Throughput: {stats['fps']:.1f} frames/s, {stats['fps_per_core']:.1f} frames/s per core, "
+          f"{stats['fps_per_cpu_second']:.1f} frames per CPU second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Detection time per frame at 720p and 1080p: full-frame Haar vs config.DETECTION
+
+Run from the application directory:
+    python benchmarks/bench_detection.py --frames 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from detection import create_detector, face_size_bounds
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def load_faces(image_dir, count):
+    files = sorted(f for f in os.listdir(image_dir) if f.endswith(".jpg"))
+    random.Random(0).shuffle(files)
+    faces = []
+    for img_file in files[:count]:
+        face = cv2.imread(os.path.join(image_dir, img_file), cv2.IMREAD_GRAYSCALE)
+        if face is not None:
+            faces.append(face)
+    return faces
+
+
+def make_frame(size, faces, face_count, rng):
+    """Composite student faces onto a noisy background; returns (frame, boxes)"""
+    width, height = size
+    frame = cv2.GaussianBlur(
+        rng.integers(60, 200, (height, width), dtype=np.uint8), (21, 21), 0
+    )
+    min_size, max_size = face_size_bounds(
+        width, config.DETECTION['camera_distance'], config.DETECTION['horizontal_fov']
+    )
+    max_size = min(max_size, height // 2)
+    boxes = []
+    for _ in range(face_count):
+        side = int(rng.integers(max(min_size, 60), max(min_size, 60) + max(1, max_size // 2)))
+        face = cv2.resize(faces[int(rng.integers(len(faces)))], (side, side))
+        x = int(rng.integers(0, width - side))
+        y = int(rng.integers(0, height - side))
+        frame[y:y+side, x:x+side] = face
+        boxes.append((x, y, side, side))
+    return frame, boxes
+
+
+def time_detector(detect, frames):
+    times = []
+    found = 0
+    for frame in frames:
+        start = time.perf_counter()
+        found += len(detect(frame))
+        times.append((time.perf_counter() - start) * 1000)
+    return np.median(times), np.percentile(times, 95), found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--faces', type=int, default=3, help="faces composited per frame")
+    parser.add_argument('--images', default="student_images")
+    args = parser.parse_args()
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    detector = create_detector(config.DETECTION)
+    faces = load_faces(args.images, 50)
+    if not faces:
+        sys.exit(f"No images found in {args.images}")
+
+    print(f"config.DETECTION = {config.DETECTION}")
+    print(f"{'resolution':<12}{'detector':<14}{'median ms':>10}{'p95 ms':>10}{'faces':>8}")
+    for label, size in RESOLUTIONS.items():
+        rng = np.random.default_rng(0)
+        frames = [make_frame(size, faces, args.faces, rng)[0] for _ in range(args.frames)]
+        results = {
+            'full-frame': time_detector(lambda g: cascade.detectMultiScale(g, 1.3, 5), frames),
+            'front-end': time_detector(detector.detect, frames),
+        }
+        for name, (median, p95, found) in results.items():
+            print(f"{label:<12}{name:<14}{median:>10.1f}{p95:>10.1f}{found:>8}")
+        print(f"{'':<12}speedup {results['full-frame'][0] / results['front-end'][0]:.1f}x "
+              f"({args.frames * args.faces} faces composited)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Latency vs recall for every available face detector backend
+
+Frames come from a directory of recorded images with an annotations.csv
+(filename,x,y,w,h; one row per face), or are composited from student_images
+when no directory is given. Run from the application directory:
+    python benchmarks/bench_detectors.py --frames-dir recordings/room_101
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from detection import available_backends, create_detector
+from tracker import iou
+from bench_detection import load_faces, make_frame
+
+
+def load_recorded(frames_dir):
+    """Return [(gray, boxes)] for the annotated frames in a directory"""
+    annotations = defaultdict(list)
+    with open(os.path.join(frames_dir, "annotations.csv"), newline='') as f:
+        for row in csv.DictReader(f):
+            annotations[row['filename']].append(
+                tuple(int(row[key]) for key in ('x', 'y', 'w', 'h'))
+            )
+    frames = []
+    for filename in sorted(annotations):
+        gray = cv2.imread(os.path.join(frames_dir, filename), cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            frames.append((gray, annotations[filename]))
+    return frames
+
+
+def evaluate(detector, frames, iou_threshold):
+    """Return (median ms, p95 ms, recall, false positives per frame)"""
+    times = []
+    found = 0
+    total = 0
+    false_positives = 0
+    for gray, truth in frames:
+        start = time.perf_counter()
+        boxes = detector.detect(gray)
+        times.append((time.perf_counter() - start) * 1000)
+
+        matched = set()
+        for box in boxes:
+            best = max(range(len(truth)), key=lambda i: iou(box, truth[i]), default=None)
+            if best is not None and best not in matched and iou(box, truth[best]) >= iou_threshold:
+                matched.add(best)
+            else:
+                false_positives += 1
+        found += len(matched)
+        total += len(truth)
+    return (np.median(times), np.percentile(times, 95),
+            found / total if total else 0.0, false_positives / len(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames-dir', help="directory of recorded frames with annotations.csv")
+    parser.add_argument('--frames', type=int, default=30, help="synthetic frames to composite")
+    parser.add_argument('--resolution', default="1280x720", help="synthetic frame size")
+    parser.add_argument('--images', default="student_images")
+    parser.add_argument('--iou', type=float, default=0.3, help="IoU needed to count a detection")
+    args = parser.parse_args()
+
+    if args.frames_dir:
+        frames = load_recorded(args.frames_dir)
+    else:
+        faces = load_faces(args.images, 50)
+        if not faces:
+            sys.exit(f"No images found in {args.images}")
+        size = tuple(int(v) for v in args.resolution.split("x"))
+        rng = np.random.default_rng(0)
+        frames = [make_frame(size, faces, 3, rng) for _ in range(args.frames)]
+    if not frames:
+        sys.exit("No frames to evaluate")
+
+    print(f"{len(frames)} frames, downscale={config.DETECTION['downscale']}, roi={config.DETECTION['roi']}")
+    print(f"{'backend':<10}{'median ms':>10}{'p95 ms':>10}{'recall':>9}{'FP/frame':>10}")
+    for backend in available_backends(config.DETECTION):
+        detector = create_detector(config.DETECTION, backend)
+        median, p95, recall, fp_rate = evaluate(detector, frames, args.iou)
+        print(f"{backend:<10}{median:>10.1f}{p95:>10.1f}{recall:>9.2f}{fp_rate:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
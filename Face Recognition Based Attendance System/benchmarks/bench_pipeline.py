@@ -0,0 +1,59 @@
+"""Check that every camera gets processed when workers are outnumbered
+
+Simulated cameras deliver frames at --fps and processing sleeps --process-ms
+per frame, so no OpenCV work is involved. Exits non-zero if any camera
+gets less than half its fair share of the processed frames. Run from the
+application directory:
+    python benchmarks/bench_pipeline.py --cameras 3 --workers 2 --process-ms 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import FramePipeline
+
+
+class FakeCamera:
+    def __init__(self, fps):
+        self.interval = 1.0 / fps
+        self.next_at = time.perf_counter()
+
+    def read(self):
+        delay = self.next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_at += self.interval
+        return True, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-camera share of processed frames with a shared worker pool")
+    parser.add_argument("--cameras", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--process-ms", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    def process(image, camera):
+        time.sleep(args.process_ms / 1000)
+
+    pipeline = FramePipeline([FakeCamera(args.fps) for _ in range(args.cameras)], process,
+                             drop_frames=True, workers=args.workers)
+    pipeline.start()
+    time.sleep(args.duration)
+    pipeline.stop()
+
+    processed = pipeline.frames_processed_per_camera
+    fair_share = sum(processed) / args.cameras
+    print(f"{args.cameras} cameras at {args.fps:g} fps, {args.workers} workers at {args.process_ms:g} ms/frame")
+    print(f"Processed per camera: {processed} (fair share {fair_share:.0f})")
+    starved = [camera for camera, count in enumerate(processed) if count < fair_share / 2]
+    if starved:
+        sys.exit(f"Starved cameras: {starved}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Latency percentiles and throughput for each stage of the recognition hot path
+
+Stages: loading training faces from the JPEG directory and from the packed
+sample store, training on a roster scaled up by replicating student_images,
+detection on composited multi-face 720p frames, per-face and per-frame
+prediction, crowded frames predicted in-process and by the process pool,
+attendance marking against a long existing log (CSV and SQLite
+stores), and the preview display conversion. Inputs are seeded, so two
+runs on the same machine measure the same work. Results are written as
+JSON; pass an earlier result with --compare to flag regressions.
+
+Run from the application directory:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from attendance_store import create_store
+from detection import create_detector
+from display import convert_frame, fit_size
+from engine import FACE_SIZE
+from recognition_pool import RecognitionPool
+from recognizers import create_recognizer
+from sample_store import SampleStore, load_face
+from bench_detection import load_faces, make_frame
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(fn, repeat, warmup=1, items=1):
+    """Run fn repeat times after warmup calls; returns latency/throughput summary"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times_ms = np.array(times) * 1000
+    total = sum(times)
+    return {
+        'runs': repeat,
+        'items_per_run': items,
+        'mean_ms': float(times_ms.mean()),
+        'p50_ms': float(np.percentile(times_ms, 50)),
+        'p95_ms': float(np.percentile(times_ms, 95)),
+        'p99_ms': float(np.percentile(times_ms, 99)),
+        'max_ms': float(times_ms.max()),
+        'throughput_per_s': repeat * items / total if total else 0.0,
+    }
+
+
+def scaled_roster(faces, ids, scale):
+    """Replicate the corpus scale times under new IDs to simulate a larger roster"""
+    offset = int(ids.max()) + 1 if len(ids) else 1
+    scaled_faces = [face for _ in range(scale) for face in faces]
+    scaled_ids = np.concatenate([ids + copy * offset for copy in range(scale)])
+    return scaled_faces, scaled_ids
+
+
+def bench_load(image_dir, workdir, repeat):
+    """Decode every JPEG in image_dir vs. map the same faces from a packed store"""
+    def load_jpegs():
+        return [load_face(os.path.join(image_dir, name)) for name in sorted(os.listdir(image_dir))
+                if name.endswith(".jpg")]
+
+    store = SampleStore(os.path.join(workdir, "faces"))
+    store.import_images(image_dir)
+    count = store.count()
+
+    def load_store():
+        faces, ids = SampleStore(store.path).load()
+        return list(faces)
+
+    return (measure(load_jpegs, repeat, items=count),
+            measure(load_store, repeat, items=count))
+
+
+def bench_train(faces, ids, repeat):
+    def train():
+        recognizer = create_recognizer(config.RECOGNITION)
+        recognizer.train(faces, ids)
+    return measure(train, repeat, warmup=0, items=len(faces))
+
+
+def bench_detect(frames):
+    detector = create_detector(config.DETECTION)
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    iterator = iter(grays * 2)
+    return measure(lambda: detector.detect(next(iterator)), len(grays), warmup=min(3, len(grays)))
+
+
+def bench_predict(recognizer, faces, queries, faces_per_frame):
+    rng = np.random.default_rng(1)
+    picks = [faces[i] for i in rng.integers(0, len(faces), queries + 1)]
+    single = iter(picks)
+    per_face = measure(lambda: recognizer.predict(next(single)), queries)
+    batches = [picks[i:i + faces_per_frame] for i in range(0, queries, faces_per_frame)]
+    batch_iter = iter(batches * 2)
+    per_frame = measure(lambda: recognizer.predict_batch(next(batch_iter)), len(batches),
+                        items=faces_per_frame)
+    return per_face, per_frame
+
+
+def bench_crowd(recognizer, faces, frames, faces_per_frame, workdir, processes):
+    """Frames with many faces, predicted in-process vs. by a RecognitionPool"""
+    rng = np.random.default_rng(2)
+    batches = [[faces[i] for i in rng.integers(0, len(faces), faces_per_frame)] for _ in range(frames)]
+    local_iter = iter(batches * 2)
+    local = measure(lambda: recognizer.predict_batch(next(local_iter)), frames, items=faces_per_frame)
+
+    model_path = os.path.join(workdir, recognizer.model_file)
+    recognizer.save(model_path)
+    pool = RecognitionPool(model_path, config.RECOGNITION, processes)
+    try:
+        pool_iter = iter(batches * 2)
+        pooled = measure(lambda: pool.predict_batch(next(pool_iter)), frames, items=faces_per_frame)
+    finally:
+        pool.close()
+    pooled['processes'] = pool.processes
+    return local, pooled
+
+
+def bench_mark(backend, log_rows, marks, workdir):
+    """Mark new students into a subject/date that already holds log_rows marks"""
+    directory = os.path.join(workdir, backend)
+    os.makedirs(directory, exist_ok=True)
+    settings = dict(config.ATTENDANCE_STORE, backend=backend, directory=directory,
+                    database=os.path.join(directory, "attendance.db"))
+    store = create_store(settings)
+    for student_id in range(log_rows):
+        store.mark("BENCH", student_id, f"Student {student_id}", "2024-01-01", "09:00:00")
+    store.flush()
+    # A fresh store has to load the existing log on the first mark
+    store.close()
+    store = create_store(settings)
+    next_id = iter(range(log_rows, log_rows + marks + 1))
+    first = measure(lambda: store.mark("BENCH", next(next_id), "New", "2024-01-01", "09:05:00"),
+                    1, warmup=0)
+    steady = measure(lambda: store.mark("BENCH", next(next_id), "New", "2024-01-01", "09:05:00"),
+                     marks - 1, warmup=0)
+    store.close()
+    return first, steady
+
+
+def bench_display(frames, width=640, height=480):
+    size, interpolation = fit_size(frames[0].shape, width, height)
+    buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    iterator = iter(frames * 2)
+    return measure(lambda: convert_frame(next(iterator), size, buffer, interpolation), len(frames))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print per-stage p50 changes; returns the stages slower than tolerance percent"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('commit')}):")
+    regressions = []
+    for stage, summary in results['stages'].items():
+        before = baseline['stages'].get(stage)
+        if not before or not before['p50_ms']:
+            continue
+        change = 100 * (summary['p50_ms'] - before['p50_ms']) / before['p50_ms']
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"  {stage:<22}{before['p50_ms']:>10.3f} -> {summary['p50_ms']:>10.3f} ms p50 "
+              f"({change:+.1f}%){flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', default="student_images")
+    parser.add_argument('--roster-scale', type=int, default=4, help="replicate the corpus this many times")
+    parser.add_argument('--train-runs', type=int, default=3)
+    parser.add_argument('--frames', type=int, default=30, help="composited 720p frames")
+    parser.add_argument('--faces', type=int, default=3, help="faces per composited frame")
+    parser.add_argument('--queries', type=int, default=300, help="faces to predict")
+    parser.add_argument('--crowd', type=int, default=12, help="faces per frame for the crowd stages")
+    parser.add_argument('--processes', type=int, default=None, help="recognition pool size (default: one per core)")
+    parser.add_argument('--log-rows', type=int, default=20000, help="existing marks in the attendance log")
+    parser.add_argument('--marks', type=int, default=200)
+    parser.add_argument('--output', help="result file (default: benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help="percent p50 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    manifest_faces = []
+    manifest_ids = []
+    for name in sorted(os.listdir(args.images)):
+        face = cv2.imread(os.path.join(args.images, name), cv2.IMREAD_GRAYSCALE)
+        if face is not None:
+            manifest_faces.append(cv2.resize(face, FACE_SIZE))
+            manifest_ids.append(int(name.split("_")[0]))
+    if not manifest_faces:
+        sys.exit(f"No images found in {args.images}")
+    faces, ids = scaled_roster(manifest_faces, np.array(manifest_ids), args.roster_scale)
+
+    rng = np.random.default_rng(0)
+    frame_faces = load_faces(args.images, 50)
+    frames = [cv2.cvtColor(make_frame((1280, 720), frame_faces, args.faces, rng)[0], cv2.COLOR_GRAY2BGR)
+              for _ in range(args.frames)]
+
+    stages = {}
+    print(f"Roster: {len(faces)} faces ({args.roster_scale}x {len(manifest_faces)} images)")
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        stages['load_jpeg'], stages['load_store'] = bench_load(args.images, workdir, args.train_runs)
+        stages['train'] = bench_train(faces, ids, args.train_runs)
+        recognizer = create_recognizer(config.RECOGNITION)
+        recognizer.train(faces, ids)
+        stages['detect_720p'] = bench_detect(frames)
+        stages['predict_face'], stages['predict_frame'] = bench_predict(recognizer, faces, args.queries, args.faces)
+        stages['predict_crowd'], stages['predict_crowd_pool'] = bench_crowd(
+            recognizer, faces, max(1, args.queries // args.crowd), args.crowd, workdir, args.processes)
+        for backend in ('csv', 'sqlite'):
+            stages[f'mark_{backend}_first'], stages[f'mark_{backend}'] = bench_mark(
+                backend, args.log_rows, args.marks, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    stages['display_720p'] = bench_display(frames)
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'config': {'detection': config.DETECTION, 'recognition': config.RECOGNITION['backend']},
+        'stages': stages,
+    }
+
+    print(f"{'stage':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}")
+    for stage, summary in stages.items():
+        print(f"{stage:<22}{summary['p50_ms']:>10.3f}{summary['p95_ms']:>10.3f}"
+              f"{summary['p99_ms']:>10.3f}{summary['throughput_per_s']:>12.1f}")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{results['commit'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
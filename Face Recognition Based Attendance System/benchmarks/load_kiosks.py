@@ -0,0 +1,109 @@
+"""Simulate N kiosks against a running recognition_service.py
+
+Each kiosk is a thread that sends face crops (or whole frames with
+--frames) at --rate requests per second, or as fast as it can with
+--rate 0. Start the service first, then run from the application directory:
+    python recognition_service.py &
+    python benchmarks/load_kiosks.py --kiosks 8 --rate 5 --duration 30
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recognition_service import QueueFull, RecognitionClient
+from bench_detection import load_faces, make_frame
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def kiosk(client, payloads, detect, rate, stop_at, results, lock):
+    latencies = []
+    ok = rejected = errors = 0
+    interval = 1.0 / rate if rate else 0.0
+    next_send = time.perf_counter() + random.random() * interval  # Don't start in lockstep
+    while time.perf_counter() < stop_at:
+        if interval:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_send += interval
+        started = time.perf_counter()
+        try:
+            client.recognize(random.choice(payloads), detect)
+            ok += 1
+            latencies.append(time.perf_counter() - started)
+        except QueueFull:
+            rejected += 1
+            time.sleep(0.05)  # Back off as the service asked
+        except Exception:
+            errors += 1
+    with lock:
+        results['latencies'].extend(latencies)
+        results['ok'] += ok
+        results['rejected'] += rejected
+        results['errors'] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the recognition service with simulated kiosks")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--kiosks", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second per kiosk, 0 for closed loop")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--frames", action="store_true", help="Send 720p frames for server-side detection")
+    args = parser.parse_args()
+
+    faces = load_faces("student_images", 50)
+    if args.frames:
+        rng = np.random.default_rng(0)
+        images = [make_frame((1280, 720), faces, 2, rng)[0] for _ in range(10)]
+        payloads = [cv2.imencode(".jpg", image)[1].tobytes() for image in images]
+    else:
+        payloads = [cv2.imencode(".png", face)[1].tobytes() for face in faces]
+
+    client = RecognitionClient(args.url)
+    before = client.metrics()
+    results = {'latencies': [], 'ok': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=kiosk, args=(RecognitionClient(args.url), payloads, args.frames,
+                                             args.rate, stop_at, results, lock))
+        for _ in range(args.kiosks)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = client.metrics()
+
+    latencies = [1000 * latency for latency in results['latencies']]
+    print(f"{args.kiosks} kiosks, {'frames' if args.frames else 'face crops'}, "
+          f"{args.rate or 'max'} req/s each, {elapsed:.1f}s")
+    print(f"Completed {results['ok']} requests ({results['ok'] / elapsed:.1f}/s), "
+          f"{results['rejected']} rejected (503), {results['errors']} errors")
+    print(f"Latency ms: p50 {percentile(latencies, 0.5):.1f}, p95 {percentile(latencies, 0.95):.1f}, "
+          f"p99 {percentile(latencies, 0.99):.1f}")
+    batches = after['batches'] - before['batches']
+    batched_faces = after['faces'] - before['faces']
+    print(f"Service: {batches} batches, {batched_faces / batches if batches else 0:.1f} faces per batch, "
+          f"queue ms p50 {after['p50_queue_ms']:.2f}, p95 {after['p95_queue_ms']:.2f}, "
+          f"p99 {after['p99_queue_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
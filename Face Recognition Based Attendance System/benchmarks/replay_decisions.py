@@ -0,0 +1,150 @@
+"""Replay recorded tracker events through the votes and sequential decision rules
+
+Record a session first, then compare when (and whether) each rule would
+have marked every student. Run from the application directory:
+    python attendance_cli.py CS101 --source lecture.mp4 --record events.csv
+    python benchmarks/replay_decisions.py events.csv --present 1843 2026
+
+Record with the sequential rule: it predicts undecided tracks more often,
+and the votes rule only needs the 'seen' frame counts that are logged
+either way. A track counts towards its student until it has produced no
+event for --linger seconds, which approximates the session dropping
+tracks a camera stops reporting.
+"""
+import argparse
+import csv
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from decision import SequentialDecision, sequential_settings
+from engine import REQUIRED_VOTES
+
+
+class TrackState:
+    def __init__(self):
+        self.candidate = None
+        self.student_id = None
+        self.votes = 0
+        self.evidence = 0.0
+        self.evidence_at = None
+        self.last_event = None
+
+
+def load_events(path):
+    with open(path, newline='') as f:
+        events = [
+            (float(row['time']), int(row['camera']), int(row['track']), row['event'],
+             row['student_id'] or None,
+             float(row['distance']) if row['distance'] else None,
+             int(row['frames']) if row['frames'] else 0)
+            for row in csv.DictReader(f)
+        ]
+    # Cameras are logged from several threads, so rows can be slightly out of order
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def replay(events, decision, threshold, required_votes, linger):
+    """{student_id: time marked} under the votes rule (decision None) or a SequentialDecision"""
+    tracks = {}
+    marked = {}
+    required = decision.accept_at if decision else required_votes
+
+    def score(track, now):
+        if decision is None:
+            return track.votes
+        if track.evidence_at is None:
+            return 0.0
+        return decision.decay(track.evidence, now - track.evidence_at)
+
+    for now, camera, track_id, event, student_id, distance, frames in events:
+        track = tracks.setdefault((camera, track_id), TrackState())
+        track.last_event = now
+        if event == 'predict':
+            if student_id != track.candidate:
+                track.candidate = student_id
+                track.evidence, track.evidence_at = 0.0, None
+            if decision is None:
+                recognized = student_id if distance < threshold else None
+                if recognized != track.student_id:
+                    track.student_id = recognized
+                    track.votes = 1 if recognized is not None else 0
+            else:
+                track.evidence = decision.update(track.evidence, track.evidence_at, distance, now)
+                track.evidence_at = now
+                track.student_id = track.candidate if track.evidence > 0 else None
+        elif event == 'seen' and track.student_id is not None:
+            track.votes += frames
+
+        student = track.student_id
+        if student is None or student in marked:
+            continue
+        total = sum(score(other, now) for other in tracks.values()
+                    if other.student_id == student and now - other.last_event <= linger)
+        if total >= required:
+            marked[student] = now
+    return marked
+
+
+def report(name, marked, first_predicted, present):
+    print(f"{name}: marked {len(marked)} students")
+    delays = []
+    for student_id, at in sorted(marked.items(), key=lambda item: item[1]):
+        delay = at - first_predicted[student_id]
+        wrong = present is not None and student_id not in present
+        if not wrong:
+            delays.append(delay)
+        print(f"  {student_id:<10} at {at:8.2f}s  {delay:6.2f}s after first prediction"
+              f"{'  FALSE MARK' if wrong else ''}")
+    if present is not None:
+        missed = sorted(present - set(marked))
+        false_marks = sorted(set(marked) - present)
+        print(f"  false marks: {len(false_marks)}, missed: {len(missed)}" + (f" {missed}" if missed else ""))
+    if delays:
+        print(f"  time to mark: median {statistics.median(delays):.2f}s, max {max(delays):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare decision rules on recorded tracker events")
+    parser.add_argument("events", help="CSV written by attendance_cli.py --record")
+    parser.add_argument("--present", nargs="*", help="Student IDs actually in the recording; others count as false marks")
+    parser.add_argument("--votes", type=int, default=REQUIRED_VOTES)
+    parser.add_argument("--threshold", type=float, default=config.RECOGNITION['threshold'])
+    parser.add_argument("--linger", type=float, default=0.5)
+    parser.add_argument("--backend", choices=sorted(config.DECISION['backends']), default=config.RECOGNITION['backend'],
+                        help="Recognizer the events were recorded with; picks match_distance and scale")
+    # Defaults come from config.DECISION for the chosen backend
+    keys = sequential_settings(config.DECISION, config.RECOGNITION['backend'])
+    for key in keys:
+        if key != 'pending_interval':
+            parser.add_argument(f"--{key.replace('_', '-')}", type=float)
+    args = parser.parse_args()
+
+    events = load_events(args.events)
+    if not events:
+        sys.exit(f"No events in {args.events}")
+    settings = sequential_settings(config.DECISION, args.backend)
+    for key in settings:
+        if getattr(args, key, None) is not None:
+            settings[key] = getattr(args, key)
+    decision = SequentialDecision(**settings)
+    present = set(args.present) if args.present is not None else None
+
+    first_predicted = {}
+    for now, camera, track_id, event, student_id, distance, frames in events:
+        if event == 'predict' and student_id is not None:
+            first_predicted.setdefault(student_id, now)
+    predictions = sum(1 for event in events if event[3] == 'predict')
+    print(f"{len(events)} events, {predictions} predictions over {events[-1][0] - events[0][0]:.1f}s")
+
+    report(f"votes ({args.votes} frames under {args.threshold:g})",
+           replay(events, None, args.threshold, args.votes, args.linger), first_predicted, present)
+    report(f"sequential (accept at {decision.accept_at:.2f}, reject at {decision.reject_at:.2f})",
+           replay(events, decision, args.threshold, args.votes, args.linger), first_predicted, present)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Settings for the face detection front end used by attendance and registration
+DETECTION = {
+    'backend': 'haar',             # haar, lbp, yunet or ssd (can be switched in the attendance tab)
+    'downscale': 0.5,              # Run the detector on a copy of the frame scaled by this factor
+    'roi': None,                   # (x, y, w, h) as fractions of the frame, e.g. (0.25, 0.0, 0.5, 1.0) for a doorway
+    'camera_distance': (0.4, 3.0), # Nearest and furthest face distance from the camera in metres
+    'horizontal_fov': 60,          # Horizontal field of view of the camera in degrees
+    'scale_factor': 1.3,           # Cascade backends only
+    'min_neighbors': 5,            # Cascade backends only
+    # Model files for the non-Haar backends, downloaded into models/
+    'backends': {
+        'lbp': {'cascade_path': 'models/lbpcascade_frontalface_improved.xml'},
+        'yunet': {'model_path': 'models/face_detection_yunet_2023mar.onnx', 'score_threshold': 0.7},
+        'ssd': {
+            'prototxt_path': 'models/deploy.prototxt',
+            'model_path': 'models/res10_300x300_ssd_iter_140000.caffemodel',
+            'score_threshold': 0.6,
+        },
+    },
+}
+
+# Face recognizer backend used for training and attendance
+RECOGNITION = {
+    'backend': 'lbph',             # lbph, or sface for embeddings from a local ONNX model
+    'threshold': 65,               # Scores below this count as a match (lower is better for both backends)
+    'processes': None,             # Worker processes for attendance predictions; None is one per usable core up to 4, 0 predicts in-process
+    'pools': 1,                    # Worker pools (one per model) kept running between sessions; each worker holds a copy of the model
+    'backends': {
+        'sface': {'model_path': 'models/face_recognition_sface_2021dec.onnx'},
+    },
+}
+
+# Where attendance marks are recorded
+ATTENDANCE_STORE = {
+    'backend': 'csv',              # csv (append-only attendance/{subject}_{date}.csv) or sqlite
+    'directory': 'attendance',     # CSV files, also where the sqlite backend exports to
+    'database': 'attendance.db',   # sqlite backend only
+    'commit_every': 10,            # sqlite backend: marks per batched commit
+}
+
+# Student, subject and enrollment registry
+REGISTRY = {
+    'database': 'registry.db',
+    # CSV files imported once when registry.db is first created
+    'import_from': {
+        'students_csv': 'student_database.csv',
+        'subjects_csv': 'subjects_database.csv',
+        'enrollment_csv': 'subject_enrollment.csv',
+    },
+}
+
+# Attendance statistics across all dates (records tab)
+ANALYTICS = {
+    'database': 'analytics.db',
+    'chronic_threshold': 75,       # Percentage of sessions below which a student is listed as chronically absent
+}
+
+# Camera preview on the register and attendance tabs
+DISPLAY = {
+    'max_fps': 30,                 # Preview redraw cap, independent of how fast frames are processed
+}
+
+# Shared recognition service for several kiosks (recognition_service.py)
+SERVICE = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'max_batch': 32,               # Faces per predict_batch call
+    'max_wait_ms': 5,              # How long a batch waits for more requests before running
+    'max_queue': 256,              # Requests allowed to wait; beyond this clients get 503
+}
+
+# Cameras used for attendance; several sources share one recognizer
+CAMERAS = {
+    'sources': [0],                # Camera indexes (or video files), e.g. [0, 1, 2] for a large hall
+    'workers': 2,                  # Processing threads shared by all cameras
+}
+
+# Per-stage timing and counters (metrics.py)
+METRICS = {
+    'enabled': True,
+    'prometheus_path': 'metrics/attendance.prom',  # Prometheus text format for a textfile collector
+    'json_path': 'metrics/attendance.json',        # Same snapshot as JSON; set either path to None to skip it
+    'interval': 10,                # Seconds between snapshots
+    'overlay': True,               # FPS and stage latencies over the attendance camera feed
+}
+
+# Sample capture when registering or retraining a student (registration.py)
+REGISTRATION = {
+    'max_samples': 20,
+    'min_sharpness': 5.0,          # Laplacian variance below this is treated as motion blur; depends on the camera
+    'max_similarity': 0.97,        # Skip a face this correlated with one already accepted
+    'timeout': 30,                 # Seconds before capture stops with whatever it has
+}
+
+# Packed training faces (sample_store.py)
+SAMPLE_STORE = {
+    'path': 'student_samples/faces',  # faces.idx index plus faces.<epoch>.bin data
+    'import_from': 'student_images',  # JPEG directory migrated into a new store; None to start empty
+}
+
+# When a recognized face counts as present (decision.py)
+DECISION = {
+    'rule': 'sequential',          # sequential (distance-weighted evidence) or votes (20 frames under the threshold)
+    'sequential': {
+        'max_step': 3.0,           # Cap per prediction, so at least three predictions are needed to accept
+        'false_accept': 0.001,     # Target rate of marking the wrong student
+        'false_reject': 0.05,      # Target rate of giving up on a present student
+        'half_life': 2.0,          # Seconds for evidence to halve
+        'pending_interval': 2,     # Frames between predictions while a track is undecided
+    },
+    # Distances are on each recognizer's own scale, so these depend on RECOGNITION['backend']
+    'backends': {
+        # match_distance: predict distance that counts neither for nor against
+        # scale: distance units per unit of log-likelihood ratio
+        'lbph': {'match_distance': 42, 'scale': 4},    # LBPH impostors score ~43-47
+        'sface': {'match_distance': 64, 'scale': 8},   # SFace's cosine threshold of 0.363; matches score well below
+    },
+}
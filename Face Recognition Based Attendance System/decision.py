@@ -0,0 +1,95 @@
+"""Sequential attendance decisions from recognizer distances
+
+Each prediction adds log-likelihood-ratio evidence for the predicted
+student: distances below match_distance count for a match, distances above
+it count against, and the step is capped so a single lucky frame can't
+decide on its own. Evidence halves every half_life seconds. As in Wald's
+sequential probability ratio test, a student is accepted once the evidence
+reaches log((1 - false_reject) / false_accept) and a track is rejected
+once it falls to log(false_reject / (1 - false_accept)). Clear matches are
+therefore accepted after a few predictions and borderline ones wait for
+more. match_distance and scale are in the recognizer's distance units, so
+config.DECISION sets them per backend.
+"""
+import csv
+import math
+import threading
+
+
+class SequentialDecision:
+    def __init__(self, match_distance=42.0, scale=4.0, max_step=3.0, false_accept=0.001,
+                 false_reject=0.05, half_life=2.0, pending_interval=2):
+        self.match_distance = match_distance
+        self.scale = scale
+        self.max_step = max_step
+        self.half_life = half_life
+        # Undecided tracks are re-recognized every pending_interval frames
+        self.pending_interval = pending_interval
+        self.accept_at = math.log((1 - false_reject) / false_accept)
+        self.reject_at = math.log(false_reject / (1 - false_accept))
+
+    def step(self, distance):
+        """Evidence one prediction adds for its student"""
+        step = (self.match_distance - distance) / self.scale
+        return max(-self.max_step, min(self.max_step, step))
+
+    def decay(self, evidence, elapsed):
+        if not self.half_life or elapsed <= 0:
+            return evidence
+        return evidence * 0.5 ** (elapsed / self.half_life)
+
+    def update(self, evidence, updated_at, distance, now):
+        """Decay evidence to now and add one prediction"""
+        if updated_at is not None:
+            evidence = self.decay(evidence, now - updated_at)
+        return evidence + self.step(distance)
+
+    def decided(self, evidence):
+        return evidence >= self.accept_at or evidence <= self.reject_at
+
+
+def sequential_settings(settings, backend):
+    """config.DECISION['sequential'] with the distance settings for a recognizer backend"""
+    if backend not in settings['backends']:
+        raise ValueError(f"No decision settings for recognizer backend: {backend}")
+    return dict(settings['sequential'], **settings['backends'][backend])
+
+
+def create_decision(settings, backend, rule=None):
+    """SequentialDecision for config.DECISION and a backend, or None for the fixed vote count"""
+    rule = rule or settings['rule']
+    if rule == 'votes':
+        return None
+    if rule != 'sequential':
+        raise ValueError(f"Unknown decision rule: {rule}")
+    return SequentialDecision(**sequential_settings(settings, backend))
+
+
+class ObservationLog:
+    """CSV of tracker events for replaying decisions offline
+
+    Rows are (time, camera, track, event, student_id, distance, frames):
+    'predict' rows carry the predicted student and distance, 'seen' rows
+    the number of frames a recognized track was confirmed for.
+    """
+
+    FIELDS = ['time', 'camera', 'track', 'event', 'student_id', 'distance', 'frames']
+
+    def __init__(self, path, started_at):
+        self.started_at = started_at
+        self.lock = threading.Lock()
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.FIELDS)
+
+    def observer(self, camera):
+        """Callback for one camera's FaceTracker"""
+        def observe(now, track_id, event, student_id=None, distance=None, frames=None):
+            with self.lock:
+                self.writer.writerow([f"{now - self.started_at:.4f}", camera, track_id, event, student_id,
+                                      "" if distance is None else f"{distance:.3f}", frames])
+        return observe
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,238 @@
+import cv2
+import math
+import os
+
+import numpy as np
+
+AVERAGE_FACE_WIDTH = 0.16  # metres
+
+
+def face_size_bounds(frame_width, camera_distance, horizontal_fov):
+    """Expected (min, max) face width in pixels for a range of camera distances"""
+    nearest, furthest = camera_distance
+    view_width = lambda d: 2 * d * math.tan(math.radians(horizontal_fov) / 2)
+    min_size = frame_width * AVERAGE_FACE_WIDTH / view_width(furthest)
+    max_size = frame_width * AVERAGE_FACE_WIDTH / view_width(nearest)
+    # Leave some margin for head pose and face width variation
+    return int(min_size * 0.8), int(max_size * 1.25)
+
+
+def clip_box(box, frame_shape):
+    """(x, y, w, h) box cut to the frame, or None if nothing of it is inside"""
+    height, width = frame_shape[:2]
+    x, y, w, h = box
+    left, top = max(0, int(x)), max(0, int(y))
+    right, bottom = min(width, int(x + w)), min(height, int(y + h))
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right - left, bottom - top
+
+
+class FaceDetector:
+    """Common detection front end: downscaling, ROI and face-size bounds
+
+    Backends implement detect_scaled(), which receives the downscaled
+    grayscale region plus size bounds at that scale. Boxes are mapped back to
+    full-resolution coordinates so faces are still cropped from the original
+    frame.
+    """
+
+    name = None
+
+    def __init__(self, downscale=1.0, roi=None, camera_distance=None,
+                 horizontal_fov=60, **other_settings):
+        # other_settings holds options meant for other backends (e.g. scale_factor)
+        self.downscale = downscale
+        self.roi = roi
+        self.camera_distance = camera_distance
+        self.horizontal_fov = horizontal_fov
+        self._size_cache = {}
+
+    def detect_scaled(self, image, min_size, max_size):
+        """Return (x, y, w, h) boxes found in the already scaled image"""
+        raise NotImplementedError
+
+    def roi_box(self, frame_shape):
+        """ROI in pixels as (x, y, w, h), or the whole frame"""
+        height, width = frame_shape[:2]
+        if self.roi is None:
+            return 0, 0, width, height
+        fx, fy, fw, fh = self.roi
+        x, y = int(fx * width), int(fy * height)
+        return x, y, min(int(fw * width), width - x), min(int(fh * height), height - y)
+
+    def size_limits(self, frame_shape):
+        """(minSize, maxSize) at the detection scale, (0, 0) meaning unbounded"""
+        width = frame_shape[1]
+        if width not in self._size_cache:
+            if self.camera_distance is None:
+                limits = ((0, 0), (0, 0))
+            else:
+                min_size, max_size = face_size_bounds(width, self.camera_distance, self.horizontal_fov)
+                min_size = int(min_size * self.downscale)
+                max_size = int(max_size * self.downscale)
+                limits = ((min_size, min_size), (max_size, max_size))
+            self._size_cache[width] = limits
+        return self._size_cache[width]
+
+    def detect(self, gray, use_roi=True):
+        """Return face boxes in full-resolution (x, y, w, h) coordinates
+
+        Boxes are clipped to the frame, since DNN backends can report faces
+        reaching past its edges, so callers can crop them directly.
+        """
+        if use_roi:
+            rx, ry, rw, rh = self.roi_box(gray.shape)
+            region = gray[ry:ry+rh, rx:rx+rw]
+        else:
+            rx, ry = 0, 0
+            region = gray
+
+        if self.downscale != 1.0:
+            small = cv2.resize(region, None, fx=self.downscale, fy=self.downscale,
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = region
+
+        min_size, max_size = self.size_limits(gray.shape)
+        faces = self.detect_scaled(small, min_size, max_size)
+
+        scale = 1.0 / self.downscale
+        boxes = [
+            clip_box((int(x * scale) + rx, int(y * scale) + ry, int(w * scale), int(h * scale)), gray.shape)
+            for (x, y, w, h) in faces
+        ]
+        return [box for box in boxes if box is not None]
+
+
+class CascadeDetector(FaceDetector):
+    """OpenCV cascade classifier (Haar or LBP)"""
+
+    def __init__(self, cascade_path, scale_factor=1.3, min_neighbors=5, **settings):
+        super().__init__(**settings)
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(f"Cascade file not found: {cascade_path}")
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load cascade: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect_scaled(self, image, min_size, max_size):
+        return self.cascade.detectMultiScale(
+            image, self.scale_factor, self.min_neighbors,
+            minSize=min_size, maxSize=max_size
+        )
+
+
+class HaarDetector(CascadeDetector):
+    name = 'haar'
+
+    def __init__(self, cascade_path=None, **settings):
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        super().__init__(cascade_path, **settings)
+
+
+class LbpDetector(CascadeDetector):
+    """LBP cascade: faster than Haar, slightly lower recall"""
+
+    name = 'lbp'
+
+    def __init__(self, cascade_path="models/lbpcascade_frontalface_improved.xml", **settings):
+        super().__init__(cascade_path, **settings)
+
+
+def _filter_size(boxes, min_size, max_size):
+    """Apply cascade-style minSize/maxSize bounds to DNN detections"""
+    low = min_size[0]
+    high = max_size[0] or float('inf')
+    return [box for box in boxes if low <= box[2] <= high]
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV FaceDetectorYN with a local YuNet ONNX model"""
+
+    name = 'yunet'
+
+    def __init__(self, model_path="models/face_detection_yunet_2023mar.onnx",
+                 score_threshold=0.7, **settings):
+        super().__init__(**settings)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found: {model_path}")
+        self.net = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+        self.input_size = None
+
+    def detect_scaled(self, image, min_size, max_size):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        if self.input_size != (width, height):
+            self.input_size = (width, height)
+            self.net.setInputSize(self.input_size)
+        _, faces = self.net.detect(image)
+        if faces is None:
+            return []
+        boxes = [tuple(int(v) for v in face[:4]) for face in faces]
+        return _filter_size(boxes, min_size, max_size)
+
+
+class SsdDetector(FaceDetector):
+    """ResNet-10 SSD face detector loaded through cv2.dnn"""
+
+    name = 'ssd'
+
+    def __init__(self, prototxt_path="models/deploy.prototxt",
+                 model_path="models/res10_300x300_ssd_iter_140000.caffemodel",
+                 score_threshold=0.6, **settings):
+        super().__init__(**settings)
+        for path in (prototxt_path, model_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"SSD model file not found: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        self.score_threshold = score_threshold
+
+    def detect_scaled(self, image, min_size, max_size):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(
+            cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0)
+        )
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        boxes = []
+        for detection in detections[detections[:, 2] >= self.score_threshold]:
+            x1, y1, x2, y2 = (detection[3:7] * np.array([width, height, width, height])).astype(int)
+            boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return _filter_size(boxes, min_size, max_size)
+
+
+BACKENDS = {
+    detector.name: detector
+    for detector in (HaarDetector, LbpDetector, YuNetDetector, SsdDetector)
+}
+
+
+def create_detector(settings, backend=None):
+    """Create the detector named by settings['backend'] (or backend) from a config dict"""
+    settings = dict(settings)
+    backend = backend or settings.pop('backend', 'haar')
+    settings.pop('backend', None)
+    backend_settings = settings.pop('backends', {}).get(backend, {})
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend}")
+    return BACKENDS[backend](**backend_settings, **settings)
+
+
+def available_backends(settings):
+    """Names of the backends whose model files can be loaded"""
+    names = []
+    for name in BACKENDS:
+        try:
+            create_detector(settings, name)
+        except (FileNotFoundError, ValueError, cv2.error):
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,139 @@
+import time
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+import metrics
+
+
+class CanvasDisplay:
+    """Shows camera frames on a Tk canvas without per-frame allocations
+
+    The canvas size is cached and only updated from <Configure> events.
+    Frames are resized with OpenCV straight into a preallocated RGB buffer,
+    pasted into a single reused PhotoImage and shown by a single canvas
+    item. Frames arriving faster than max_fps are skipped, so the display
+    rate doesn't follow the processing rate.
+    """
+
+    def __init__(self, canvas, max_fps=30):
+        self.canvas = canvas
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.last_shown = 0.0
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+        self.width = int(canvas.cget('width'))
+        self.height = int(canvas.cget('height'))
+        self.layout_key = None  # (frame shape, canvas size) the buffer was sized for
+        self.size = None  # Display (width, height)
+        self.interpolation = cv2.INTER_AREA
+        self.buffer = None
+        self.photo = None
+        self.item = None
+        self.overlay = None
+
+        canvas.bind('<Configure>', self.on_configure, add='+')
+
+    def on_configure(self, event):
+        self.width, self.height = event.width, event.height
+
+    def due(self):
+        """Whether the next frame would be shown under the rate cap"""
+        return time.monotonic() - self.last_shown >= self.min_interval
+
+    def show(self, frame, force=False):
+        """Draw a BGR frame scaled to fit the canvas; returns False if it was skipped"""
+        now = time.monotonic()
+        if not force and now - self.last_shown < self.min_interval:
+            self.frames_skipped += 1
+            metrics.increment('display_skipped')
+            return False
+        self.last_shown = now
+
+        with metrics.timer('display'):
+            self._draw(frame)
+        self.frames_shown += 1
+        return True
+
+    def _draw(self, frame):
+        self._layout(frame.shape)
+        image = convert_frame(frame, self.size, self.buffer, self.interpolation)
+
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage(image=image)
+        else:
+            self.photo.paste(image)
+        if self.item is None:
+            self.item = self.canvas.create_image(
+                self.width // 2, self.height // 2, anchor=tk.CENTER, image=self.photo
+            )
+        else:
+            self.canvas.itemconfigure(self.item, image=self.photo)
+        if self.overlay is not None:
+            self.canvas.tag_raise(self.overlay)
+
+    def set_overlay(self, text):
+        """Show a line of text (e.g. FPS and stage latencies) over the top-left corner"""
+        if self.overlay is None:
+            self.overlay = self.canvas.create_text(
+                8, 8, anchor=tk.NW, text=text, fill='#00FF00', font=('Courier', 10, 'bold')
+            )
+        else:
+            self.canvas.itemconfigure(self.overlay, text=text)
+
+    def _layout(self, shape):
+        """Recompute the display size and buffers when the frame or canvas size changes"""
+        key = (shape, self.width, self.height)
+        if key == self.layout_key:
+            return
+        self.layout_key = key
+
+        size, self.interpolation = fit_size(shape, self.width, self.height)
+
+        if size != self.size:
+            self.size = size
+            self.buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.photo = None  # PhotoImage.paste needs an image of the same size
+        if self.item is not None:
+            self.canvas.coords(self.item, self.width // 2, self.height // 2)
+
+    def clear(self):
+        """Remove the frame from the canvas"""
+        if self.item is not None:
+            self.canvas.delete(self.item)
+        if self.overlay is not None:
+            self.canvas.delete(self.overlay)
+        self.item = None
+        self.overlay = None
+        self.photo = None
+        self.layout_key = None
+
+
+def fit_size(shape, width, height):
+    """Display (width, height) and interpolation for a frame shape scaled to fit a canvas"""
+    frame_height, frame_width = shape[:2]
+    scale = min(width / frame_width, height / frame_height)
+    size = (max(1, int(frame_width * scale)), max(1, int(frame_height * scale)))
+    # INTER_AREA avoids aliasing when shrinking, INTER_LINEAR is cheaper when enlarging
+    return size, cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+
+
+def convert_frame(frame, size, buffer, interpolation):
+    """Resize a BGR frame into an RGB buffer of the given size; returns a PIL image"""
+    cv2.resize(frame, size, dst=buffer, interpolation=interpolation)
+    cv2.cvtColor(buffer, cv2.COLOR_BGR2RGB, dst=buffer)
+    return Image.fromarray(buffer)
+
+
+def tile_frames(frames):
+    """Place frames from several cameras side by side at the smallest frame height"""
+    height = min(frame.shape[0] for frame in frames)
+    resized = [
+        frame if frame.shape[0] == height else
+        cv2.resize(frame, (frame.shape[1] * height // frame.shape[0], height), interpolation=cv2.INTER_AREA)
+        for frame in frames
+    ]
+    return cv2.hconcat(resized)
@@ -0,0 +1,557 @@
+import os
+import json
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+
+import config
+import metrics
+from analytics import AttendanceAnalytics
+from decision import ObservationLog, create_decision
+from attendance_store import create_store
+from detection import create_detector
+from pipeline import FramePipeline
+from recognition_pool import RecognitionPool, default_processes
+from recognizers import create_recognizer
+from registration import SampleCapture
+from registry import Registry
+from sample_store import SampleStore
+from sources import is_live, open_source
+from subject_models import SubjectModelCache
+from tracker import FaceTracker
+
+FACE_SIZE = (200, 200)
+REQUIRED_VOTES = 20  # Confirmed frames on one track before a student is marked (votes rule)
+
+
+class AttendanceEngine:
+    """Training, detection, recognition and attendance marking without a GUI
+
+    Owns the recognizer, detector, registry and attendance store. The Tk app
+    and the command line (attendance_cli.py) both drive this class.
+    """
+
+    def __init__(self):
+        # LBPH or embedding backend, see config.RECOGNITION
+        self.recognizer = create_recognizer(config.RECOGNITION)
+        # Packed training faces, see config.SAMPLE_STORE
+        self.sample_store = SampleStore(config.SAMPLE_STORE['path'])
+        import_dir = config.SAMPLE_STORE['import_from']
+        if self.sample_store.is_new and import_dir and os.path.isdir(import_dir):
+            # One-shot migration of the loose JPEGs used before the store
+            print(f"Imported {self.sample_store.import_images(import_dir)} face samples from {import_dir}")
+        # Recognizers trained on each subject's roster, most recently used kept loaded
+        self.subject_models = SubjectModelCache(self.sample_store, config.RECOGNITION)
+        # Worker pools per saved model, kept running between sessions
+        self.recognition_pools = OrderedDict()  # model_path -> ((manifest, processes), RecognitionPool)
+        # Detector backend and downscale / ROI settings come from config.DETECTION
+        self.face_detector = create_detector(config.DETECTION)
+
+        # Timing histograms and counters written for a local scraper, see config.METRICS
+        self.metrics_exporter = metrics.start_exporter(config.METRICS)
+
+        # Sample signature of an updated model not written to disk yet, see update_recognizer()
+        self.unsaved_manifest = None
+        # Setup directories and load the saved model
+        self.setup_directories()
+        # Students, subjects and enrollment live in SQLite, see config.REGISTRY
+        self.registry = Registry(config.REGISTRY['database'])
+        if self.registry.is_new:
+            # One-shot import of the CSV files used before the registry
+            self.registry.import_csv(**config.REGISTRY['import_from'])
+
+        self.student_db = self.registry.students()
+        self.subjects_db = self.registry.subjects()
+        # Which students are enrolled in which subject
+        self.subject_rosters = self.registry.rosters()
+
+        # Append-only CSV or SQLite attendance records, see config.ATTENDANCE_STORE
+        self.attendance_store = create_store(config.ATTENDANCE_STORE)
+        self.analytics = AttendanceAnalytics(self.attendance_store, config.ANALYTICS['database'])
+
+    def setup_directories(self):
+        """Create necessary directories if they don't exist"""
+        for dir_name in ["attendance", "trainer"]:
+            if not os.path.exists(dir_name):
+                os.makedirs(dir_name)
+
+        # Load trained model if exists
+        self.model_path = os.path.join("trainer", self.recognizer.model_file)
+        self.manifest_path = os.path.splitext(self.model_path)[0] + "_manifest.json"
+        if os.path.exists(self.model_path):
+            try:
+                if self.is_model_current():
+                    self.recognizer.read(self.model_path)
+                else:
+                    # Face samples changed since the model was saved
+                    self.train_recognizer()
+            except:
+                # If there's any error loading the model, retrain it
+                self.train_recognizer()
+
+    # Model
+
+    def has_model(self):
+        return self.unsaved_manifest is not None or os.path.exists(self.model_path)
+
+    def build_image_manifest(self):
+        """Signature of the stored face samples, saved alongside the model"""
+        return self.sample_store.signature()
+
+    def save_manifest(self, manifest=None):
+        """Store the sample signature the current model was trained on"""
+        if manifest is None:
+            manifest = self.build_image_manifest()
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+    def is_model_current(self):
+        """Check whether the saved model matches the stored face samples"""
+        if not os.path.exists(self.model_path) or not os.path.exists(self.manifest_path):
+            return False
+        try:
+            with open(self.manifest_path) as f:
+                saved_manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return saved_manifest == self.build_image_manifest()
+
+    def ensure_model_current(self):
+        """Retrain only if the face samples differ from the saved manifest"""
+        self.save_model()
+        if not self.is_model_current():
+            self.train_recognizer()
+
+    def train_recognizer(self):
+        """Train the face recognizer"""
+        # Snapshot the sample set before reading so later changes trigger a retrain
+        manifest = self.build_image_manifest()
+        # The retrained model replaces any update still waiting to be saved
+        self.unsaved_manifest = None
+
+        # Views into the memory-mapped sample store, nothing is decoded
+        faces, ids = self.sample_store.load()
+        faces = list(faces)
+
+        if faces:  # Only train if there are faces
+            try:
+                # Train the recognizer
+                with metrics.timer('train'):
+                    self.recognizer.train(faces, ids)
+                metrics.increment('trainings')
+
+                # Save the model along with the images it was trained on
+                self.recognizer.save(self.model_path)
+                self.save_manifest(manifest)
+                print("Model trained and saved successfully")
+            except Exception as e:
+                print(f"Error training model: {e}")
+                # If training fails, try to delete the model file and train again
+                if os.path.exists(self.model_path):
+                    os.remove(self.model_path)
+                self.recognizer = create_recognizer(config.RECOGNITION)
+                self.recognizer.train(faces, ids)
+                self.recognizer.save(self.model_path)
+                self.save_manifest(manifest)
+
+    def update_recognizer(self, student_id, faces):
+        """Add new face samples to the existing model without a full retrain
+
+        Only the in-memory model is updated. Saving rewrites the whole model
+        (2.8 s for 485 LBPH samples, against 0.085 s for the update), so it
+        waits for save_model(), which runs before the next session and on
+        close(). The samples are already in the sample store, so if the
+        process dies first the model is simply retrained on the next start.
+        """
+        if not faces:
+            return
+
+        labels = np.array([int(student_id)] * len(faces))
+        try:
+            # update() only processes the new samples, not the whole roster
+            with metrics.timer('model_update'):
+                self.recognizer.update(faces, labels)
+            self.unsaved_manifest = self.build_image_manifest()
+            print(f"Model updated with {len(faces)} samples for student {student_id}")
+        except Exception as e:
+            print(f"Error updating model: {e}")
+            # Fall back to a full rebuild if the stored model can't be updated
+            self.train_recognizer()
+
+    def save_model(self):
+        """Write a model changed by update_recognizer() to disk, if there is one"""
+        if self.unsaved_manifest is None:
+            return
+        try:
+            with metrics.timer('model_save'):
+                self.recognizer.save(self.model_path)
+            self.save_manifest(self.unsaved_manifest)
+        except Exception as e:
+            # The manifest stays stale, so the next start retrains instead
+            print(f"Error saving model: {e}")
+        self.unsaved_manifest = None
+
+    def rebuild_model(self):
+        """Rebuild the recognizer from every stored face sample"""
+        # Replaced samples are only flagged stale; drop them while retraining anyway
+        self.sample_store.compact()
+        self.recognizer = create_recognizer(config.RECOGNITION)
+        self.train_recognizer()
+
+    # Detection
+
+    def set_detector(self, backend):
+        """Switch the face detector backend; raises if its model can't be loaded"""
+        self.face_detector = create_detector(config.DETECTION, backend)
+
+    def detect_faces(self, gray):
+        """Return face boxes found in a grayscale frame"""
+        return self.face_detector.detect(gray)
+
+    def extract_faces(self, gray):
+        """[(box, 200x200 face)] for registration, searching the whole frame"""
+        return [
+            ((x, y, w, h), cv2.resize(gray[y:y+h, x:x+w], FACE_SIZE))
+            for x, y, w, h in self.face_detector.detect(gray, use_roi=False)
+        ]
+
+    # Students and subjects
+
+    def start_sample_capture(self, student_id):
+        """SampleCapture that keeps sharp, varied faces and stores them in the background"""
+        return SampleCapture(student_id, self.sample_store, **config.REGISTRATION)
+
+    def delete_face_samples(self, student_id):
+        """Mark a student's stored samples stale before capturing new ones"""
+        self.sample_store.mark_stale(student_id)
+
+    def register_student(self, student_id, name, faces):
+        """Store a student and add their samples to the model; returns True if the ID is new"""
+        self.registry.add_student(student_id, name)
+        is_new_student = student_id not in self.student_db
+        self.student_db[student_id] = name
+        # Only feed the new samples into the existing model
+        self.update_recognizer(student_id, faces)
+        return is_new_student
+
+    def reload_subject_roster(self, subject_code):
+        """Refresh one subject's roster after enrollment changed"""
+        roster = self.registry.roster(subject_code)
+        if roster:
+            self.subject_rosters[subject_code] = roster
+        else:
+            self.subject_rosters.pop(subject_code, None)
+        self.subject_models.invalidate(subject_code)
+
+    def session_recognizer(self, subject):
+        """(roster, recognizer, saved model path) to use for a subject's attendance
+
+        Matches only against the subject's enrolled students when it has a
+        roster, otherwise against everyone with the full model.
+        """
+        roster = self.subject_rosters.get(subject, set()) & set(self.student_db)
+        if roster:
+            recognizer = self.subject_models.get(subject, roster)
+            if recognizer is not None:
+                return roster, recognizer, self.subject_models.paths(subject, recognizer)[0]
+        return set(self.student_db), self.recognizer, self.model_path
+
+    def recognition_pool(self, model_path, processes):
+        """RecognitionPool for a saved model, reused across sessions
+
+        The workers only reload when the model's manifest changed since the
+        pool was started. The most recently used config.RECOGNITION['pools']
+        pools are kept; sessions run one at a time, so closing the others
+        never stops a pool in use.
+        """
+        manifest_path = os.path.splitext(model_path)[0] + "_manifest.json"
+        try:
+            with open(manifest_path) as f:
+                manifest = f.read()
+        except OSError:
+            manifest = None
+        key = (manifest, processes)
+        cached = self.recognition_pools.get(model_path)
+        if cached is not None and cached[0] == key:
+            self.recognition_pools.move_to_end(model_path)
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+
+        # Workers load the saved model once and read faces from shared memory
+        pool = RecognitionPool(model_path, config.RECOGNITION, processes)
+        self.recognition_pools[model_path] = (key, pool)
+        self.recognition_pools.move_to_end(model_path)
+        while len(self.recognition_pools) > config.RECOGNITION['pools']:
+            _, (_, oldest) = self.recognition_pools.popitem(last=False)
+            oldest.close()
+        return pool
+
+    def close(self):
+        """Save a pending model update and stop the recognition worker pools"""
+        self.save_model()
+        while self.recognition_pools:
+            _, (_, pool) = self.recognition_pools.popitem()
+            pool.close()
+
+    # Attendance
+
+    def load_marked_students(self, subject):
+        """Return the IDs already marked present for a subject today"""
+        date = datetime.now().strftime("%Y-%m-%d")
+        return self.attendance_store.marked(subject, date)
+
+    def mark_attendance(self, subject, student_id, name):
+        """Record attendance in the attendance store"""
+        try:
+            with metrics.timer('mark'):
+                if self.attendance_store.mark(subject, student_id, name):
+                    metrics.increment('marks')
+        except Exception as e:
+            print(f"Error marking attendance: {e}")
+
+    def start_session(self, subject, sources=0, timeout=None, required_votes=REQUIRED_VOTES,
+                      workers=None, rule=None, record_path=None, processes=None):
+        """Open one or more sources and return a running AttendanceSession"""
+        session = AttendanceSession(self, subject, sources, timeout, required_votes, workers, rule,
+                                    record_path, processes)
+        session.start()
+        return session
+
+
+class AttendanceSession:
+    """One attendance run for a subject over cameras, video files or image directories
+
+    Every source gets its own capture thread and face tracker; a fixed pool
+    of processing threads shares one recognizer, so adding a camera costs a
+    thread and a few frames of memory rather than another model. Each track
+    scores its student (sequential evidence or votes, see config.DECISION),
+    scores are summed per student across cameras, and marking happens in
+    next_frame() on the caller's thread. Live cameras drop stale frames,
+    files and image directories process every frame. Prediction can run in
+    a RecognitionPool of worker processes, see config.RECOGNITION.
+    """
+
+    def __init__(self, engine, subject, sources=0, timeout=None, required_votes=REQUIRED_VOTES,
+                 workers=None, rule=None, record_path=None, processes=None):
+        self.engine = engine
+        self.subject = subject
+        self.sources = list(sources) if isinstance(sources, (list, tuple)) else [sources]
+        # Retrain only if the face samples changed since the model was saved
+        engine.ensure_model_current()
+        self.roster, self.recognizer, model_path = engine.session_recognizer(subject)
+
+        # None means the fixed vote count; distances are on the recognizer's own scale
+        self.decision = create_decision(config.DECISION, self.recognizer.name, rule)
+        self.required_score = self.decision.accept_at if self.decision else required_votes
+        # Tracker events for benchmarks/replay_decisions.py
+        self.observations = ObservationLog(record_path, time.perf_counter()) if record_path else None
+
+        # Evidence or votes are counted per face track by each camera's tracker
+        self.trackers = [
+            FaceTracker(detect_interval=5, recheck_interval=30, threshold=config.RECOGNITION['threshold'],
+                        decision=self.decision,
+                        observer=self.observations.observer(camera) if self.observations else None)
+            for camera in range(len(self.sources))
+        ]
+        self.track_scores = {}  # (camera, track_id) -> (student_id, score)
+        self.first_seen = {}  # student_id -> capture time of the first frame they were recognized in
+        # Students marked in an earlier session today count towards the roster
+        self.marked = engine.load_marked_students(subject)
+        self.newly_marked = []
+
+        self.live = all(is_live(source) for source in self.sources)
+        self.caps = []
+        self.recognition_pool = None
+        if processes is None:
+            processes = config.RECOGNITION['processes']
+        if processes is None:
+            processes = default_processes()
+        try:
+            for source in self.sources:
+                self.caps.append(open_source(source))
+            if processes:
+                # Owned by the engine, so later sessions reuse the loaded workers
+                self.recognition_pool = engine.recognition_pool(model_path, processes)
+        except Exception:
+            for cap in self.caps:
+                cap.release()
+            if self.observations:
+                self.observations.close()
+            raise
+        if workers is None:
+            workers = min(len(self.sources), config.CAMERAS['workers'])
+        # Cascade detectors aren't shared between threads; each worker loads its own
+        self.local = threading.local()
+        # The in-process recognizer (no pool) is one model shared by every worker;
+        # cv2 predictions aren't thread-safe, and a copy per thread would reload it
+        self.recognizer_lock = threading.Lock()
+        self.pipeline = FramePipeline(self.caps, self.track_and_recognize,
+                                      drop_frames=self.live, workers=workers)
+        self.timeout = timeout
+        self.stop_requested = False
+        self.end_reason = None
+        self.started_at = None
+        self.finished_at = None
+        self.latency_total = 0.0
+        self.frames_consumed = 0
+
+    def detect_faces(self, gray):
+        detector = self.engine.face_detector
+        if self.pipeline.workers_running > 1:
+            if getattr(self.local, 'detector', None) is None or self.local.detector.name != detector.name:
+                self.local.detector = create_detector(config.DETECTION, detector.name)
+            detector = self.local.detector
+        with metrics.timer('detect'):
+            boxes = detector.detect(gray)
+        metrics.increment('faces_detected', len(boxes))
+        return boxes
+
+    def recognize_faces(self, gray, boxes):
+        """Predict (student_id, confidence) for each face box in one batch"""
+        # Detectors and trackers both clip boxes to the frame
+        faces = [cv2.resize(gray[y:y+h, x:x+w], FACE_SIZE) for x, y, w, h in boxes]
+        with metrics.timer('predict'):
+            if self.recognition_pool:
+                predictions = self.recognition_pool.predict_batch(faces)
+            else:
+                with self.recognizer_lock:
+                    predictions = self.recognizer.predict_batch(faces)
+        metrics.increment('predictions', len(faces))
+        return [(str(student_id), confidence) for student_id, confidence in predictions]
+
+    def track_and_recognize(self, frame, camera=0):
+        """Update a camera's face tracks, recognizing only new or stale tracks"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self.trackers[camera].process(gray, self.detect_faces, self.recognize_faces)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.pipeline.start()
+
+    def stop(self):
+        """Ask the session to finish; the caller's loop ends on its next check"""
+        self.stop_requested = True
+
+    def check_finished(self):
+        """Return why the session should end, or None to keep going"""
+        if self.stop_requested:
+            return "Session stopped"
+        if self.timeout and time.monotonic() - self.started_at >= self.timeout:
+            return "Session timed out"
+        if self.roster and self.roster <= self.marked:
+            return "All students marked"
+        if self.pipeline.exhausted():
+            return "Camera stopped" if self.live else "End of input"
+        return None
+
+    def next_frame(self, timeout=0.01):
+        """Vote on and mark the next processed frame
+
+        Returns the pipeline Frame with frame.faces set to
+        [(box, student_id, name, progress, marked)], where progress is the
+        student's score as a fraction of what marking needs, or None if no
+        frame was ready.
+        """
+        frame = self.pipeline.get_result(timeout)
+        if frame is None:
+            return None
+        self.latency_total += time.perf_counter() - frame.captured_at
+        self.frames_consumed += 1
+
+        # Tracks this camera no longer reports have ended and stop counting
+        camera = frame.camera
+        self.track_scores = {key: value for key, value in self.track_scores.items() if key[0] != camera}
+        for box, student_id, confidence, track_id, score in frame.result:
+            if student_id is not None:
+                self.track_scores[(camera, track_id)] = (student_id, score)
+
+        frame.faces = []
+        for box, student_id, confidence, track_id, score in frame.result:
+            name = None
+            progress = 0.0
+            if student_id is not None:  # Recognized by the tracker's rule
+                name = self.engine.student_db.get(student_id, "Unknown")
+                self.first_seen.setdefault(student_id, frame.captured_at)
+                score = self.student_score(student_id)
+                progress = min(1.0, score / self.required_score)
+                if student_id not in self.marked and score >= self.required_score:
+                    self.engine.mark_attendance(self.subject, student_id, name)
+                    metrics.observe('time_to_mark', time.perf_counter() - self.first_seen[student_id])
+                    self.marked.add(student_id)
+                    self.newly_marked.append((student_id, name))
+            frame.faces.append((box, student_id, name, progress, student_id in self.marked))
+        return frame
+
+    def student_score(self, student_id):
+        """Evidence or votes for a student summed over their current tracks on every camera"""
+        return sum(score for track_student, score in self.track_scores.values() if track_student == student_id)
+
+    def run(self, on_frame=None, on_idle=None):
+        """Process frames until the session ends; returns the end reason"""
+        while True:
+            self.end_reason = self.check_finished()
+            if self.end_reason:
+                return self.end_reason
+            frame = self.next_frame()
+            if frame is None:
+                if on_idle:
+                    on_idle()
+            elif on_frame:
+                on_frame(frame)
+
+    def close(self):
+        """Stop the pipeline, release the source and flush marks"""
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+        self.pipeline.stop()
+        for cap in self.caps:
+            cap.release()
+        if self.observations:
+            self.observations.close()
+        self.engine.attendance_store.flush()
+
+    def marked_count(self):
+        """Students of the roster marked so far today"""
+        return len(self.marked & self.roster)
+
+    def stats(self):
+        """Throughput counters for the session so far"""
+        end = self.finished_at or time.monotonic()
+        elapsed = max(end - self.started_at, 1e-9) if self.started_at else 0.0
+        processed = self.pipeline.frames_processed
+        depths = self.pipeline.queue_depths()
+        return {
+            'elapsed': elapsed,
+            'cameras': len(self.caps),
+            'frames_captured': sum(self.pipeline.frames_captured),
+            'frames_captured_per_camera': list(self.pipeline.frames_captured),
+            'frames_processed': processed,
+            'frames_processed_per_camera': list(self.pipeline.frames_processed_per_camera),
+            'frames_dropped': depths['capture_dropped'] + depths['render_dropped'],
+            'fps': processed / elapsed if elapsed else 0.0,
+            'mean_latency_ms': 1000 * self.latency_total / self.frames_consumed if self.frames_consumed else 0.0,
+            'queue_capture': depths['capture'],
+            'queue_render': depths['render'],
+        }
+
+
+def annotate_frame(frame, faces):
+    """Draw boxes and labels for the faces returned by AttendanceSession.next_frame"""
+    for (x, y, w, h), student_id, name, progress, marked in faces:
+        if student_id is None:
+            color = (0, 0, 255)  # Red for unknown
+            label = "Unknown"
+        elif marked:
+            color = (0, 255, 0)  # Green for marked
+            label = f"{name} (Marked)"
+        else:
+            color = (255, 165, 0)  # Orange for recognizing
+            label = f"{name} [{progress:.0%}]"
+        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+        cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+    return frame
@@ -0,0 +1,197 @@
+"""Per-stage timing histograms and counters, with Prometheus text and JSON export
+
+    import metrics
+    with metrics.timer('detect'):
+        boxes = detector.detect(gray)
+    metrics.increment('faces_detected', len(boxes))
+
+Everything records into one process-wide registry. MetricsExporter writes
+a snapshot to disk every few seconds for a local scraper (node_exporter's
+textfile collector reads the .prom file as is).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for live percentiles"""
+
+    def __init__(self, window=256):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)  # (monotonic time, seconds)
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append((time.monotonic(), seconds))
+
+    def percentile(self, p):
+        values = sorted(value for _, value in self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    def rate(self, window=5.0):
+        """Observations per second over the last window seconds"""
+        cutoff = time.monotonic() - window
+        recent = [stamp for stamp, _ in self.recent if stamp >= cutoff]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-9)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def stage(self, stage):
+        """(recent p50 seconds, observations per second) for one stage"""
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                return 0.0, 0.0
+            return histogram.percentile(0.5), histogram.rate()
+
+    def snapshot(self):
+        """Counters and per-stage summaries as plain data"""
+        with self.lock:
+            return {
+                'timestamp': time.time(),
+                'uptime_seconds': time.time() - self.started_at,
+                'counters': dict(self.counters),
+                'stages': {
+                    stage: {
+                        'count': histogram.count,
+                        'sum_seconds': histogram.total,
+                        'p50_ms': 1000 * histogram.percentile(0.50),
+                        'p95_ms': 1000 * histogram.percentile(0.95),
+                        'p99_ms': 1000 * histogram.percentile(0.99),
+                        'rate_per_s': histogram.rate(),
+                        'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], histogram.buckets)),
+                    }
+                    for stage, histogram in self.histograms.items()
+                },
+            }
+
+    def prometheus_text(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE attendance_{name}_total counter")
+                lines.append(f"attendance_{name}_total {value}")
+            if self.histograms:
+                lines.append("# TYPE attendance_stage_seconds histogram")
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'attendance_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'attendance_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'attendance_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'attendance_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def overlay_text(self):
+        """One-line summary for the camera canvas"""
+        parts = []
+        fps = self.stage('process')[1]
+        parts.append(f"FPS {fps:.1f}")
+        for stage in ('capture', 'detect', 'predict', 'display'):
+            p50, _ = self.stage(stage)
+            if p50:
+                parts.append(f"{stage} {1000 * p50:.1f}ms")
+        with self.lock:
+            dropped = self.counters.get('frames_dropped', 0)
+        parts.append(f"dropped {dropped}")
+        return " | ".join(parts)
+
+
+registry = MetricsRegistry()
+increment = registry.increment
+observe = registry.observe
+timer = registry.timer
+
+
+def write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)  # Scrapers never see a half-written file
+
+
+class MetricsExporter:
+    """Writes the registry to a .prom and/or .json file every interval seconds"""
+
+    def __init__(self, prometheus_path=None, json_path=None, interval=10.0, metrics_registry=registry):
+        self.prometheus_path = prometheus_path
+        self.json_path = json_path
+        self.interval = interval
+        self.registry = metrics_registry
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="metrics-exporter", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def write(self):
+        try:
+            if self.prometheus_path:
+                write_atomic(self.prometheus_path, self.registry.prometheus_text())
+            if self.json_path:
+                write_atomic(self.json_path, json.dumps(self.registry.snapshot(), indent=2))
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def _loop(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.write()
+
+
+def start_exporter(settings):
+    """Start a MetricsExporter from config.METRICS, or return None if disabled"""
+    if not settings.get('enabled'):
+        return None
+    return MetricsExporter(settings.get('prometheus_path'), settings.get('json_path'),
+                           settings.get('interval', 10.0)).start()
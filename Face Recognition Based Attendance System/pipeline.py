@@ -0,0 +1,220 @@
+import threading
+import time
+from collections import deque
+
+import metrics
+
+
+class DropOldestQueue:
+    """Bounded queue that discards the oldest item instead of blocking
+
+    put(block=True) waits for space instead, for sources like video files
+    where every frame should be processed.
+    """
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.dropped = 0
+        self.condition = threading.Condition()
+
+    def put(self, item, block=False, timeout=None):
+        """Add an item, dropping the oldest one if the queue is full
+
+        With block set, wait up to timeout for space instead; returns False
+        if the item could not be added.
+        """
+        with self.condition:
+            if block and len(self.items) >= self.maxsize:
+                self.condition.wait_for(lambda: len(self.items) < self.maxsize, timeout)
+                if len(self.items) >= self.maxsize:
+                    return False
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None if nothing arrives before timeout"""
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.condition.notify_all()  # Wake a blocked put()
+            return item
+
+    def qsize(self):
+        with self.condition:
+            return len(self.items)
+
+
+class Frame:
+    """A captured frame plus the camera and time it was read"""
+
+    def __init__(self, index, image, camera=0):
+        self.index = index
+        self.image = image
+        self.camera = camera
+        self.captured_at = time.perf_counter()
+        self.result = None
+
+
+class FramePipeline:
+    """Capture threads per camera feeding a shared pool of processing threads
+
+    Each camera's capture thread reads into its own drop-oldest queue, so a
+    slow camera never holds back the others. Processing threads take the
+    queued frame from whichever camera is ready, run process_fn(image,
+    camera) and push the frame (with frame.result set) into a shared
+    drop-oldest queue that the caller renders from on the Tk main thread.
+    A camera is only processed by one thread at a time, so its frames stay
+    in order and per-camera state (like a tracker) needs no locking.
+
+    Live cameras queue a single frame each, so a new frame replaces the
+    waiting one and processing always starts on the newest, and the render
+    queue holds one processed frame per camera. With drop_frames=False
+    (video files, image directories) the queues hold queue_size frames per
+    camera and every stage waits for space instead of dropping, so every
+    frame is processed.
+    """
+
+    def __init__(self, caps, process_fn, queue_size=2, drop_frames=True, workers=1):
+        self.caps = list(caps) if isinstance(caps, (list, tuple)) else [caps]
+        self.process_fn = process_fn
+        self.block = not drop_frames
+        if drop_frames:
+            queue_size = 1  # Anything queued behind the newest frame is already stale
+        self.frame_queues = [DropOldestQueue(queue_size) for _ in self.caps]
+        self.result_queue = DropOldestQueue(queue_size * len(self.caps))
+        self.camera_busy = [threading.Lock() for _ in self.caps]
+        self.ready = threading.Condition()  # Notified whenever a frame is queued
+        self.running = threading.Event()
+        self.cameras_failed = [False] * len(self.caps)
+        self.frames_captured = [0] * len(self.caps)
+        self.frames_processed = 0
+        self.frames_processed_per_camera = [0] * len(self.caps)
+        self.next_camera = 0
+        self.counter_lock = threading.Lock()
+        self.workers_running = workers
+        self.threads = [
+            threading.Thread(target=self._capture_loop, args=(camera,), name=f"capture-{camera}", daemon=True)
+            for camera in range(len(self.caps))
+        ] + [
+            threading.Thread(target=self._process_loop, name=f"process-{worker}", daemon=True)
+            for worker in range(workers)
+        ]
+
+    @property
+    def camera_failed(self):
+        """True once every camera has stopped delivering frames"""
+        return all(self.cameras_failed)
+
+    @property
+    def processing_done(self):
+        return self.workers_running == 0
+
+    def start(self):
+        self.running.set()
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running.clear()
+        with self.ready:
+            self.ready.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+
+    def _put(self, queue, frame):
+        """Queue a frame, retrying while blocked so stop() is still noticed"""
+        while self.running.is_set():
+            dropped = queue.dropped
+            if queue.put(frame, block=self.block, timeout=0.1):
+                if queue.dropped > dropped:
+                    metrics.increment('frames_dropped')
+                return
+
+    def _capture_loop(self, camera):
+        cap = self.caps[camera]
+        while self.running.is_set():
+            with metrics.timer('capture'):
+                ret, image = cap.read()
+            if not ret:
+                # Camera lost or end of file; frames already queued are still processed
+                self.cameras_failed[camera] = True
+                break
+            self.frames_captured[camera] += 1
+            metrics.increment('frames_captured')
+            self._put(self.frame_queues[camera], Frame(self.frames_captured[camera], image, camera))
+            with self.ready:
+                self.ready.notify()
+        with self.ready:
+            self.ready.notify_all()
+
+    def _next_frame(self):
+        """Claim a camera with a queued frame; returns (camera, frame) or None
+
+        Cameras are tried round-robin, starting after the last one claimed,
+        so a busy camera 0 can't starve the others when workers are short.
+        """
+        with self.counter_lock:
+            start = self.next_camera
+        cameras = len(self.frame_queues)
+        for offset in range(cameras):
+            camera = (start + offset) % cameras
+            queue = self.frame_queues[camera]
+            if queue.qsize() and self.camera_busy[camera].acquire(blocking=False):
+                frame = queue.get(timeout=0)
+                if frame is not None:
+                    with self.counter_lock:
+                        self.next_camera = (camera + 1) % cameras
+                    return camera, frame
+                self.camera_busy[camera].release()
+        return None
+
+    def _process_loop(self):
+        while self.running.is_set():
+            claimed = self._next_frame()
+            if claimed is None:
+                if self.camera_failed and not any(queue.qsize() for queue in self.frame_queues):
+                    break
+                with self.ready:
+                    self.ready.wait(0.05)
+                continue
+            camera, frame = claimed
+            try:
+                with metrics.timer('process'):
+                    frame.result = self.process_fn(frame.image, camera)
+            except Exception as e:
+                print(f"Error processing frame from camera {camera}: {e}")
+                continue
+            finally:
+                self.camera_busy[camera].release()
+            with self.counter_lock:
+                self.frames_processed += 1
+                self.frames_processed_per_camera[camera] += 1
+            metrics.increment('frames_processed')
+            self._put(self.result_queue, frame)
+        with self.counter_lock:
+            self.workers_running -= 1
+
+    def exhausted(self):
+        """True once every source has ended and every processed frame was taken"""
+        return self.processing_done and self.result_queue.qsize() == 0
+
+    def get_result(self, timeout=None):
+        """Return the next processed frame, or None"""
+        return self.result_queue.get(timeout)
+
+    def queue_depths(self):
+        """Current depth and drop count of each stage's input queues"""
+        return {
+            'capture': sum(queue.qsize() for queue in self.frame_queues),
+            'capture_dropped': sum(queue.dropped for queue in self.frame_queues),
+            'render': self.result_queue.qsize(),
+            'render_dropped': self.result_queue.dropped,
+        }
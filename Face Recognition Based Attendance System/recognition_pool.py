@@ -0,0 +1,171 @@
+"""Face recognition spread over a pool of worker processes
+
+Each worker loads the saved model once. Faces are handed over through one
+multiprocessing.shared_memory block split into 200x200 slots: the caller
+copies a face into a free slot and only the slot numbers are pickled, and
+workers read the faces in place. A frame's faces are split across the
+workers, so frames with many faces use several cores.
+
+    pool = RecognitionPool("trainer/face_model.yml", config.RECOGNITION, processes=4)
+    future = pool.submit(faces)       # Returns at once
+    results = future.result()         # [(id, distance)] in input order
+    pool.close()
+"""
+import math
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from recognizers import create_recognizer
+
+FACE_SIZE = (200, 200)
+# Every worker holds its own copy of the model (an LBPH model of a few hundred
+# students is tens of MB), so the default pool stays small on many-core machines
+MAX_DEFAULT_PROCESSES = 4
+
+worker_recognizer = None
+worker_faces = None
+worker_memory = None
+
+
+def init_worker(memory_name, slots, model_path, settings):
+    """Attach to the shared face slots and load the model once per process"""
+    global worker_recognizer, worker_faces, worker_memory
+    import cv2
+    cv2.setNumThreads(1)  # One core per worker; the pool provides the parallelism
+    # Pool workers share the parent's resource tracker, so attaching here
+    # doesn't make the block go away when a worker exits
+    worker_memory = shared_memory.SharedMemory(name=memory_name)
+    worker_faces = np.ndarray((slots,) + FACE_SIZE, dtype=np.uint8, buffer=worker_memory.buf)
+    worker_recognizer = create_recognizer(settings)
+    worker_recognizer.read(model_path)
+
+
+def predict_slots(slot_indexes):
+    """[(id, distance)] for the faces in the given shared-memory slots, as one batch"""
+    faces = [worker_faces[slot] for slot in slot_indexes]
+    return [tuple(prediction) for prediction in worker_recognizer.predict_batch(faces)]
+
+
+def usable_cores():
+    """Cores this process may run on, respecting CPU affinity where the OS reports it"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_processes():
+    """One worker per usable core up to MAX_DEFAULT_PROCESSES, or none on a single core"""
+    cores = usable_cores()
+    return min(MAX_DEFAULT_PROCESSES, cores) if cores > 1 else 0
+
+
+class RecognitionPool:
+    """Process-pool recognizer with the predict_batch() contract of the in-process ones"""
+
+    def __init__(self, model_path, settings, processes=None, slots=None):
+        self.processes = processes or default_processes() or 1
+        # Enough slots for several frames in flight on every worker
+        self.slots = slots or max(64, 16 * self.processes)
+        self.memory = shared_memory.SharedMemory(create=True, size=self.slots * FACE_SIZE[0] * FACE_SIZE[1])
+        self.faces = np.ndarray((self.slots,) + FACE_SIZE, dtype=np.uint8, buffer=self.memory.buf)
+        self.free_slots = list(range(self.slots))
+        self.slots_freed = threading.Condition()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes, initializer=init_worker,
+            initargs=(self.memory.name, self.slots, model_path, settings),
+        )
+        self.lock = threading.Lock()
+        self.closed = False
+        # Start the workers now, before the session's threads, and surface a model that won't load
+        try:
+            self.executor.submit(predict_slots, []).result()
+        except Exception:
+            self.close()
+            raise
+
+    def _take_slots(self, count):
+        """Wait until count slots are free and take them all at once
+
+        A caller waiting here holds no slots, so callers can't each hold
+        part of the slots while waiting for the rest.
+        """
+        with self.slots_freed:
+            self.slots_freed.wait_for(lambda: len(self.free_slots) >= count)
+            taken = self.free_slots[-count:]
+            del self.free_slots[-count:]
+        return taken
+
+    def _release_slots(self, slots):
+        with self.slots_freed:
+            self.free_slots.extend(slots)
+            self.slots_freed.notify_all()
+
+    def submit(self, faces):
+        """Start recognizing 200x200 grayscale faces; returns a Future of [(id, distance)]
+
+        The faces are split into one chunk per worker, or into chunks of at
+        most self.slots faces for larger batches. Each chunk is sent as soon
+        as its slots are taken, so this blocks only while a chunk waits for
+        earlier faces to finish.
+        """
+        result = Future()
+        if not len(faces):
+            result.set_result([])
+            return result
+
+        chunk_size = min(math.ceil(len(faces) / self.processes), self.slots)
+        starts = range(0, len(faces), chunk_size)
+        outputs = [None] * len(starts)
+        remaining = [len(starts)]
+
+        def chunk_done(position, slots, future):
+            self._release_slots(slots)
+            error = future.exception()
+            with self.lock:
+                if result.done():
+                    return
+                if error is not None:
+                    result.set_exception(error)
+                    return
+                outputs[position] = future.result()
+                remaining[0] -= 1
+                if not remaining[0]:
+                    result.set_result([prediction for output in outputs for prediction in output])
+
+        for position, start in enumerate(starts):
+            if result.done():
+                break  # An earlier chunk failed
+            chunk = faces[start:start + chunk_size]
+            slots = self._take_slots(len(chunk))
+            for slot, face in zip(slots, chunk):
+                np.copyto(self.faces[slot], face)
+            try:
+                future = self.executor.submit(predict_slots, slots)
+            except Exception as e:
+                self._release_slots(slots)
+                with self.lock:
+                    if not result.done():
+                        result.set_exception(e)
+                break
+            future.add_done_callback(lambda future, position=position, slots=slots: chunk_done(position, slots, future))
+        return result
+
+    def predict_batch(self, faces):
+        return self.submit(faces).result()
+
+    def predict(self, face):
+        return self.predict_batch([face])[0]
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        if self.closed:
+            return
+        self.closed = True
+        self.executor.shutdown(wait=True)
+        del self.faces
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,316 @@
+"""Local HTTP recognition service shared by several kiosks
+
+    python recognition_service.py                 # settings from config.SERVICE
+
+POST /recognize with an encoded image (JPEG/PNG) as the body. By default
+the image is one face crop; with ?detect=1 it is a camera frame and faces
+are detected first. The response is JSON:
+    {"faces": [{"box": [x, y, w, h], "student_id": "1843", "name": "...",
+                "confidence": 41.2}], "queue_ms": 1.3}
+student_id is null when the confidence is over the threshold. When the
+queue is full the service answers 503 with Retry-After instead of queueing.
+GET /metrics returns batching and queue-time counters as JSON.
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+import config
+import metrics
+from engine import FACE_SIZE, AttendanceEngine
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Request:
+    """Faces from one client call waiting for their batch"""
+
+    def __init__(self, faces):
+        self.faces = faces
+        self.enqueued_at = time.perf_counter()
+        self.queue_time = None
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Groups faces from concurrent requests into one predict_batch call
+
+    A batch is closed when it holds max_batch faces or max_wait_ms has
+    passed since its first request was taken. At most max_queue requests
+    may wait; submit() raises QueueFull beyond that so clients back off.
+    """
+
+    def __init__(self, recognizer, max_batch=32, max_wait_ms=5, max_queue=256):
+        self.recognizer = recognizer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.metrics_lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.faces = 0
+        self.queue_time_total = 0.0
+        self.queue_times = deque(maxlen=1000)  # Recent queue times for percentiles
+        self.thread = threading.Thread(target=self._batch_loop, name="batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, faces, timeout=10.0):
+        """Queue faces and wait for [(student_id, confidence)]"""
+        request = Request(faces)
+        with self.condition:
+            if len(self.pending) >= self.max_queue:
+                with self.metrics_lock:
+                    self.rejected += 1
+                metrics.increment('service_rejected')
+                raise QueueFull()
+            self.pending.append(request)
+            self.condition.notify()
+        if not request.done.wait(timeout):
+            raise TimeoutError("Recognition timed out")
+        if request.error is not None:
+            raise request.error
+        return request.results, request.queue_time
+
+    def _take_batch(self):
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait(0.1)
+            if not self.pending:
+                return []
+            batch = [self.pending.popleft()]
+            size = len(batch[0].faces)
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                if not self.pending:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                    continue
+                if size + len(self.pending[0].faces) > self.max_batch:
+                    break
+                request = self.pending.popleft()
+                batch.append(request)
+                size += len(request.faces)
+            return batch
+
+    def _batch_loop(self):
+        while self.running:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            faces = [face for request in batch for face in request.faces]
+            try:
+                with metrics.timer('predict'):
+                    results = self.recognizer.predict_batch(faces) if faces else []
+            except Exception as e:
+                results = None
+                for request in batch:
+                    request.error = e
+            position = 0
+            for request in batch:
+                request.queue_time = started - request.enqueued_at
+                if results is not None:
+                    request.results = results[position:position + len(request.faces)]
+                    position += len(request.faces)
+                request.done.set()
+
+            with self.metrics_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.faces += len(faces)
+                for request in batch:
+                    self.queue_time_total += request.queue_time
+                    self.queue_times.append(request.queue_time)
+            for request in batch:
+                metrics.observe('service_queue', request.queue_time)
+            metrics.increment('predictions', len(faces))
+            metrics.increment('service_requests', len(batch))
+
+    def metrics(self):
+        with self.metrics_lock:
+            recent = sorted(self.queue_times)
+            percentile = lambda p: 1000 * recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+            return {
+                'requests': self.requests,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'faces': self.faces,
+                'queue_depth': len(self.pending),
+                'mean_batch_faces': self.faces / self.batches if self.batches else 0.0,
+                'mean_queue_ms': 1000 * self.queue_time_total / self.requests if self.requests else 0.0,
+                'p50_queue_ms': percentile(0.50),
+                'p95_queue_ms': percentile(0.95),
+                'p99_queue_ms': percentile(0.99),
+            }
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=1.0)
+
+
+class RecognitionService(ThreadingHTTPServer):
+    """HTTP front end holding one warm recognizer for every kiosk"""
+
+    daemon_threads = True
+
+    def __init__(self, engine, host="127.0.0.1", port=8765, max_batch=32, max_wait_ms=5, max_queue=256):
+        super().__init__((host, port), RecognitionHandler)
+        self.engine = engine
+        self.threshold = config.RECOGNITION['threshold']
+        self.batcher = MicroBatcher(engine.recognizer, max_batch, max_wait_ms, max_queue)
+        self.detector_lock = threading.Lock()
+
+    def detect(self, gray):
+        # Cascade detectors keep internal buffers, so one frame at a time
+        with self.detector_lock, metrics.timer('detect'):
+            return self.engine.detect_faces(gray)
+
+    def recognize(self, image_bytes, detect=False):
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError("Could not decode image")
+        if detect:
+            boxes = [tuple(int(v) for v in box) for box in self.detect(gray)]
+            faces = [cv2.resize(gray[y:y+h, x:x+w], FACE_SIZE) for x, y, w, h in boxes]
+        else:
+            boxes = [(0, 0, gray.shape[1], gray.shape[0])]
+            faces = [cv2.resize(gray, FACE_SIZE)]
+
+        results, queue_time = self.batcher.submit(faces) if faces else ([], 0.0)
+        response = []
+        for box, (student_id, confidence) in zip(boxes, results):
+            student_id = str(student_id) if confidence < self.threshold else None
+            response.append({
+                'box': list(box),
+                'student_id': student_id,
+                'name': self.engine.student_db.get(student_id) if student_id else None,
+                'confidence': round(float(confidence), 2),
+            })
+        return {'faces': response, 'queue_ms': round(1000 * queue_time, 3)}
+
+    def server_close(self):
+        self.batcher.stop()
+        super().server_close()
+
+
+class RecognitionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so kiosks reuse their connection
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self.send_json(200, self.server.batcher.metrics())
+        elif path == "/health":
+            self.send_json(200, {'status': 'ok', 'students': len(self.server.engine.student_db)})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if url.path != "/recognize":
+            self.send_json(404, {'error': 'not found'})
+            return
+        detect = parse_qs(url.query).get('detect', ['0'])[0] == '1'
+        try:
+            self.send_json(200, self.server.recognize(body, detect))
+        except QueueFull:
+            self.send_json(503, {'error': 'queue full'}, [("Retry-After", "1")])
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        pass  # One line per request would dominate the output under load
+
+
+class RecognitionClient:
+    """Minimal client for kiosks; raises QueueFull when the service pushes back"""
+
+    def __init__(self, url="http://127.0.0.1:8765", timeout=10.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def recognize(self, image, detect=False):
+        """Send a BGR/grayscale image (or already encoded bytes); returns the response dict"""
+        if not isinstance(image, bytes):
+            # Frames are large, so JPEG; crops are small enough to send lossless
+            image = cv2.imencode(".jpg" if detect else ".png", image)[1].tobytes()
+        request = urllib.request.Request(
+            f"{self.url}/recognize?detect={int(detect)}", data=image,
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                raise QueueFull() from e
+            raise
+
+    def metrics(self):
+        with urllib.request.urlopen(f"{self.url}/metrics", timeout=self.timeout) as response:
+            return json.load(response)
+
+
+def main():
+    settings = config.SERVICE
+    parser = argparse.ArgumentParser(description="Serve face recognition to several kiosks")
+    parser.add_argument("--host", default=settings['host'])
+    parser.add_argument("--port", type=int, default=settings['port'])
+    parser.add_argument("--max-batch", type=int, default=settings['max_batch'])
+    parser.add_argument("--max-wait-ms", type=float, default=settings['max_wait_ms'])
+    parser.add_argument("--max-queue", type=int, default=settings['max_queue'])
+    args = parser.parse_args()
+
+    engine = AttendanceEngine()
+    engine.ensure_model_current()
+    if not engine.has_model():
+        parser.error("No trained model found. Please register students first.")
+
+    service = RecognitionService(engine, args.host, args.port, args.max_batch,
+                                 args.max_wait_ms, args.max_queue)
+    print(f"Recognition service on http://{args.host}:{args.port} "
+          f"(batches of up to {args.max_batch} faces, {args.max_wait_ms} ms wait)")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+
+
+if __name__ == "__main__":
+    main()
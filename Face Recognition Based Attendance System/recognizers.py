@@ -0,0 +1,106 @@
+import cv2
+import os
+import numpy as np
+
+
+class LBPHRecognizer:
+    """OpenCV LBPH recognizer; predict() returns (id, distance), lower is better"""
+
+    name = 'lbph'
+    model_file = "face_model.yml"
+
+    def __init__(self, **settings):
+        self.model = cv2.face.LBPHFaceRecognizer_create()
+
+    def train(self, faces, ids):
+        self.model.train(faces, np.asarray(ids))
+
+    def update(self, faces, ids):
+        self.model.update(faces, np.asarray(ids))
+
+    def predict(self, face):
+        return self.model.predict(face)
+
+    def predict_batch(self, faces):
+        """LBPH has no batched query, so predict faces one by one"""
+        return [self.model.predict(face) for face in faces]
+
+    def save(self, path):
+        self.model.save(path)
+
+    def read(self, path):
+        self.model.read(path)
+
+
+class SFaceRecognizer:
+    """FaceRecognizerSF embeddings matched with one matrix product per frame
+
+    Every training face is stored as a normalized float32 row of a single
+    embedding matrix. predict() keeps the LBPH contract of (id, score) with
+    lower meaning a better match: score = (1 - cosine similarity) * 100, so
+    SFace's recommended cosine threshold of 0.363 is a score of about 64.
+    """
+
+    name = 'sface'
+    model_file = "face_embeddings.npz"
+
+    def __init__(self, model_path="models/face_recognition_sface_2021dec.onnx", **settings):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"SFace model not found: {model_path}")
+        self.net = cv2.FaceRecognizerSF.create(model_path, "")
+        self.embeddings = np.empty((0, 128), dtype=np.float32)
+        self.labels = np.empty(0, dtype=np.int32)
+
+    def embed(self, faces):
+        """Return an (n, 128) matrix of L2-normalized embeddings"""
+        rows = []
+        for face in faces:
+            if face.ndim == 2:
+                face = cv2.cvtColor(face, cv2.COLOR_GRAY2BGR)
+            face = cv2.resize(face, (112, 112))
+            rows.append(self.net.feature(face).reshape(-1))
+        if not rows:
+            return np.empty((0, self.embeddings.shape[1]), dtype=np.float32)
+        matrix = np.asarray(rows, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        return matrix
+
+    def train(self, faces, ids):
+        self.embeddings = self.embed(faces)
+        self.labels = np.asarray(ids, dtype=np.int32)
+
+    def update(self, faces, ids):
+        self.embeddings = np.vstack([self.embeddings, self.embed(faces)])
+        self.labels = np.concatenate([self.labels, np.asarray(ids, dtype=np.int32)])
+
+    def predict(self, face):
+        return self.predict_batch([face])[0]
+
+    def predict_batch(self, faces):
+        """Match every face against the whole roster with a single matrix product"""
+        if not len(self.labels):
+            raise ValueError("SFace recognizer has not been trained")
+        queries = self.embed(faces)
+        similarity = queries @ self.embeddings.T
+        best = similarity.argmax(axis=1)
+        scores = similarity[np.arange(len(best)), best]
+        return [(int(self.labels[i]), float((1.0 - score) * 100)) for i, score in zip(best, scores)]
+
+    def save(self, path):
+        np.savez(path, embeddings=self.embeddings, labels=self.labels)
+
+    def read(self, path):
+        with np.load(path) as data:
+            self.embeddings = np.ascontiguousarray(data['embeddings'], dtype=np.float32)
+            self.labels = data['labels'].astype(np.int32)
+
+
+BACKENDS = {recognizer.name: recognizer for recognizer in (LBPHRecognizer, SFaceRecognizer)}
+
+
+def create_recognizer(settings, backend=None):
+    """Create the recognizer named by settings['backend'] (or backend)"""
+    backend = backend or settings.get('backend', 'lbph')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown recognizer backend: {backend}")
+    return BACKENDS[backend](**settings.get('backends', {}).get(backend, {}))
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+
+
+def sharpness(face):
+    """Variance of the Laplacian; low values mean a blurry face"""
+    return cv2.Laplacian(face, cv2.CV_64F).var()
+
+
+def thumbnail(face, size=32):
+    """Zero-mean, unit-length thumbnail so a dot product is a normalized correlation"""
+    vector = cv2.resize(face, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    vector -= vector.mean()
+    return vector / (np.linalg.norm(vector) + 1e-6)
+
+
+class SampleWriter:
+    """Appends face samples to the sample store on a background thread"""
+
+    def __init__(self, store, student_id):
+        self.store = store
+        self.student_id = student_id
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, name="sample-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, face):
+        self.queue.put(face)
+
+    def _write_loop(self):
+        closed = False
+        while not closed:
+            # Append everything that queued up while the last write ran in one go
+            faces = [self.queue.get()]
+            while not self.queue.empty():
+                faces.append(self.queue.get())
+            if faces[-1] is None:
+                closed = True
+                faces.pop()
+            try:
+                self.store.append(self.student_id, faces)
+            except OSError as e:
+                print(f"Error writing samples for {self.student_id}: {e}")
+
+    def close(self):
+        """Wait until every queued sample is in the store"""
+        self.queue.put(None)
+        self.thread.join()
+
+
+class SampleCapture:
+    """Collects registration samples that are sharp and differ from each other
+
+    offer() takes the largest face in a frame and accepts it only if its
+    Laplacian variance is at least min_sharpness and its thumbnail
+    correlation with every accepted sample is below max_similarity.
+    Accepted samples are appended to the sample store by a SampleWriter,
+    so the capture loop never waits on the disk.
+    """
+
+    def __init__(self, student_id, store, max_samples=20,
+                 min_sharpness=5.0, max_similarity=0.97, timeout=30.0):
+        self.student_id = student_id
+        self.max_samples = max_samples
+        self.min_sharpness = min_sharpness
+        self.max_similarity = max_similarity
+        self.deadline = time.monotonic() + timeout
+        self.faces = []
+        self.thumbnails = []
+        self.rejected_blurry = 0
+        self.rejected_similar = 0
+        self.writer = SampleWriter(store, student_id)
+
+    @property
+    def done(self):
+        return len(self.faces) >= self.max_samples or time.monotonic() >= self.deadline
+
+    def offer(self, detections):
+        """Consider the largest of [(box, face)]; returns (box, accepted) or None"""
+        if not detections or self.done:
+            return None
+        box, face = max(detections, key=lambda detection: detection[0][2] * detection[0][3])
+
+        if sharpness(face) < self.min_sharpness:
+            self.rejected_blurry += 1
+            metrics.increment('samples_rejected_blurry')
+            return box, False
+        vector = thumbnail(face)
+        if self.thumbnails and float(np.max(np.dot(self.thumbnails, vector))) >= self.max_similarity:
+            self.rejected_similar += 1
+            metrics.increment('samples_rejected_similar')
+            return box, False
+
+        self.faces.append(face)
+        self.thumbnails.append(vector)
+        self.writer.write(face)
+        metrics.increment('samples_accepted')
+        return box, True
+
+    def status(self):
+        return (f"Captured {len(self.faces)}/{self.max_samples} "
+                f"(skipped {self.rejected_blurry} blurry, {self.rejected_similar} too similar)")
+
+    def finish(self):
+        """Flush pending writes and return the accepted faces"""
+        self.writer.close()
+        return self.faces
@@ -0,0 +1,147 @@
+import csv
+import os
+import sqlite3
+import threading
+
+
+class Registry:
+    """Students, subjects and subject enrollment stored in SQLite
+
+    Every change is a single indexed INSERT/DELETE, so registering or
+    removing one record doesn't rewrite the whole table.
+    """
+
+    def __init__(self, database="registry.db"):
+        self.lock = threading.Lock()
+        self.is_new = not os.path.exists(database)
+        self.conn = sqlite3.connect(database, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS students (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS subjects (
+                code TEXT PRIMARY KEY,
+                name TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS enrollment (
+                subject_code TEXT NOT NULL REFERENCES subjects(code) ON DELETE CASCADE,
+                student_id TEXT NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+                PRIMARY KEY (subject_code, student_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        self.conn.commit()
+
+    def _write(self, sql, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+    def _read(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # Students
+
+    def students(self):
+        """{student ID: name} in registration order"""
+        return dict(self._read("SELECT id, name FROM students ORDER BY rowid"))
+
+    def add_student(self, student_id, name):
+        """Register a student, updating the name if the ID already exists"""
+        self._write(
+            "INSERT INTO students (id, name) VALUES (?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET name = excluded.name",
+            [(str(student_id), name)]
+        )
+
+    def delete_student(self, student_id):
+        self._write("DELETE FROM students WHERE id = ?", [(str(student_id),)])
+
+    # Subjects
+
+    def subjects(self):
+        """{subject code: subject name} in the order they were added"""
+        return dict(self._read("SELECT code, name FROM subjects ORDER BY rowid"))
+
+    def add_subject(self, code, name):
+        """Add a subject; returns False if the code already exists"""
+        try:
+            self._write("INSERT INTO subjects (code, name) VALUES (?, ?)", [(code, name)])
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def delete_subject(self, code):
+        """Delete a subject and its enrollment"""
+        self._write("DELETE FROM subjects WHERE code = ?", [(str(code),)])
+
+    # Enrollment
+
+    def rosters(self):
+        """{subject code: set of enrolled student IDs}"""
+        rosters = {}
+        for code, student_id in self._read("SELECT subject_code, student_id FROM enrollment"):
+            rosters.setdefault(code, set()).add(student_id)
+        return rosters
+
+    def roster(self, code):
+        rows = self._read("SELECT student_id FROM enrollment WHERE subject_code = ?", (code,))
+        return {row[0] for row in rows}
+
+    def enroll(self, code, student_ids):
+        self._write(
+            "INSERT OR IGNORE INTO enrollment (subject_code, student_id) VALUES (?, ?)",
+            [(code, str(student_id)) for student_id in student_ids]
+        )
+
+    def unenroll(self, code, student_ids):
+        self._write(
+            "DELETE FROM enrollment WHERE subject_code = ? AND student_id = ?",
+            [(code, str(student_id)) for student_id in student_ids]
+        )
+
+    # Import
+
+    def import_csv(self, students_csv="student_database.csv",
+                   subjects_csv="subjects_database.csv",
+                   enrollment_csv="subject_enrollment.csv"):
+        """One-shot import from the CSV files used before the registry existed"""
+        def read_rows(path, columns):
+            if not os.path.exists(path):
+                return []
+            with open(path, newline='') as f:
+                return [tuple(row[column].strip() for column in columns) for row in csv.DictReader(f)]
+
+        students = read_rows(students_csv, ('ID', 'Name'))
+        subjects = read_rows(subjects_csv, ('Subject Code', 'Subject Name'))
+        enrollment = read_rows(enrollment_csv, ('Subject Code', 'Student ID'))
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO students (id, name) VALUES (?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET name = excluded.name", students
+            )
+            # Duplicates and enrollments of unknown students or subjects are skipped,
+            # so count the rows actually inserted rather than the CSV rows
+            added_subjects = self.conn.executemany(
+                "INSERT OR IGNORE INTO subjects (code, name) VALUES (?, ?)", subjects
+            ).rowcount
+            added_enrollments = self.conn.executemany(
+                "INSERT OR IGNORE INTO enrollment (subject_code, student_id)"
+                " SELECT ?, ? WHERE EXISTS (SELECT 1 FROM subjects WHERE code = ?1)"
+                " AND EXISTS (SELECT 1 FROM students WHERE id = ?2)", enrollment
+            ).rowcount
+        # Existing students are updated, so count each ID once
+        print(f"Imported {len({student_id for student_id, _ in students})} students, {added_subjects} subjects, "
+              f"{added_enrollments} enrollments into the registry")
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    # Re-run the CSV import by hand: python registry.py
+    Registry().import_csv()
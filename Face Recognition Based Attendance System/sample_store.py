@@ -0,0 +1,270 @@
+"""Packed store of 200x200 grayscale training faces
+
+The faces live back to back as raw uint8 pixels in one append-only data
+file, so training maps them with a single np.memmap instead of listing a
+directory and decoding a JPEG per sample. An index file holds a 16-byte
+header and one fixed-size record per face: (student id, stale flag, byte
+offset into the data file). Replacing a student appends the new faces and
+flags the old records stale; compact() drops stale faces when a full
+rebuild runs anyway.
+
+    python sample_store.py --import student_images   # Migrate loose JPEGs
+    python sample_store.py --export student_images   # Write them back out
+    python sample_store.py --compact
+"""
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+FACE_SIZE = (200, 200)
+FACE_BYTES = FACE_SIZE[0] * FACE_SIZE[1]
+MAGIC = b'FSMP'
+FORMAT_VERSION = 1
+HEADER = np.dtype([('magic', 'S4'), ('version', '<u4'), ('epoch', '<u8')])
+RECORD = np.dtype([('id', '<i4'), ('stale', '<u4'), ('offset', '<u8')])
+
+
+def load_face(path):
+    """Read one image as a normalized 200x200 grayscale array"""
+    face_img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if face_img is None:
+        return None
+    if face_img.shape != FACE_SIZE:
+        face_img = cv2.resize(face_img, FACE_SIZE)
+    return face_img
+
+
+class SampleStore:
+    """Append-only, memory-mappable face samples with an id/offset index
+
+    Compaction writes a new data file named after the next epoch and then
+    atomically swaps the index, so a crash never leaves the index pointing
+    into the wrong data.
+    """
+
+    def __init__(self, path="student_samples/faces"):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.lock = threading.Lock()
+        self.is_new = not os.path.exists(self.index_path)
+        if self.is_new:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._write_index(self.index_path, 0, np.empty(0, dtype=RECORD))
+        self.epoch, self.records = self._read_index()
+        open(self.data_path, 'ab').close()
+        self._data = None  # Cached memmap of the data file and the size it was mapped at
+
+    @property
+    def data_path(self):
+        return f"{self.path}.{self.epoch}.bin"
+
+    def _write_index(self, path, epoch, records):
+        header = np.array([(MAGIC, FORMAT_VERSION, epoch)], dtype=HEADER)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(records.tobytes())
+        os.replace(tmp_path, path)
+
+    def _read_index(self):
+        with open(self.index_path, 'rb') as f:
+            raw = f.read()
+        header = np.frombuffer(raw[:HEADER.itemsize], dtype=HEADER)
+        if len(header) != 1 or header[0]['magic'] != MAGIC or header[0]['version'] != FORMAT_VERSION:
+            raise ValueError(f"{self.index_path} is not a version {FORMAT_VERSION} sample index")
+        epoch = int(header[0]['epoch'])
+
+        # Ignore a record cut short by a crash mid-append
+        body = raw[HEADER.itemsize:]
+        body = body[:len(body) - len(body) % RECORD.itemsize]
+        records = np.frombuffer(body, dtype=RECORD).copy()
+
+        # Faces are written before their records, but drop any record past the end of the data
+        data_path = f"{self.path}.{epoch}.bin"
+        data_size = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+        return epoch, records[records['offset'] + FACE_BYTES <= data_size]
+
+    # Writing
+
+    def append(self, student_id, faces):
+        """Add faces for one student; returns how many were stored"""
+        return self._append(np.full(len(faces), int(student_id), dtype=np.int32), faces)
+
+    def _append(self, ids, faces):
+        if not len(faces):
+            return 0
+        packed = np.empty((len(faces),) + FACE_SIZE, dtype=np.uint8)
+        for row, face in enumerate(faces):
+            packed[row] = face if face.shape == FACE_SIZE else cv2.resize(face, FACE_SIZE)
+
+        with self.lock:
+            with open(self.data_path, 'ab') as f:
+                start = f.seek(0, os.SEEK_END)
+                f.write(packed.tobytes())
+            records = np.zeros(len(faces), dtype=RECORD)
+            records['id'] = ids
+            records['offset'] = start + FACE_BYTES * np.arange(len(faces), dtype=np.uint64)
+            with open(self.index_path, 'ab') as f:
+                f.write(records.tobytes())
+            self.records = np.concatenate([self.records, records])
+        return len(faces)
+
+    def mark_stale(self, student_id):
+        """Flag a student's samples as replaced; returns how many were flagged"""
+        with self.lock:
+            rows = np.flatnonzero((self.records['id'] == int(student_id)) & (self.records['stale'] == 0))
+            if not len(rows):
+                return 0
+            self.records['stale'][rows] = 1
+            # Rewrite only the student's runs of records in place
+            breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+            with open(self.index_path, 'r+b') as f:
+                for run in np.split(rows, breaks):
+                    f.seek(HEADER.itemsize + int(run[0]) * RECORD.itemsize)
+                    f.write(self.records[run[0]:run[-1] + 1].tobytes())
+        return len(rows)
+
+    def compact(self):
+        """Rewrite the data file without stale samples; returns how many were dropped"""
+        with self.lock:
+            live = self.records[self.records['stale'] == 0]
+            dropped = len(self.records) - len(live)
+            if not dropped:
+                return 0
+            data = self._faces()
+            old_data_path = self.data_path
+            epoch = self.epoch + 1
+            records = live.copy()
+            records['offset'] = FACE_BYTES * np.arange(len(live), dtype=np.uint64)
+            with open(f"{self.path}.{epoch}.bin", 'wb') as f:
+                for offset in live['offset']:
+                    f.write(data[int(offset) // FACE_BYTES].tobytes())
+            self._write_index(self.index_path, epoch, records)
+            self.epoch, self.records = epoch, records
+            self._data = None
+            del data
+            try:
+                os.remove(old_data_path)
+            except OSError as e:
+                # Still mapped elsewhere (e.g. on Windows); it's unused from now on
+                print(f"Could not remove {old_data_path}: {e}")
+        return dropped
+
+    # Reading
+
+    def _faces(self):
+        """Read-only (N, 200, 200) map of every face in the data file, stale ones included"""
+        size = os.path.getsize(self.data_path)
+        if self._data is None or self._data[0] != size:
+            count = size // FACE_BYTES
+            if count:
+                faces = np.memmap(self.data_path, dtype=np.uint8, mode='r', shape=(count,) + FACE_SIZE)
+            else:
+                faces = np.empty((0,) + FACE_SIZE, dtype=np.uint8)
+            self._data = (size, faces)
+        return self._data[1]
+
+    def _live(self, student_ids=None):
+        mask = self.records['stale'] == 0
+        if student_ids is not None:
+            mask &= np.isin(self.records['id'], [int(student_id) for student_id in student_ids])
+        return self.records[mask]
+
+    def load(self, student_ids=None):
+        """(faces, ids) for the live samples, optionally only for some students
+
+        When every face in the data file is wanted (no stale samples, no
+        roster filter) the faces are the memmap itself and nothing is copied.
+        """
+        with self.lock:
+            records = self._live(student_ids)
+            data = self._faces()
+        ids = records['id'].astype(np.int32)
+        rows = (records['offset'] // FACE_BYTES).astype(np.intp)
+        if len(rows) == len(data) and np.array_equal(rows, np.arange(len(data))):
+            return data, ids
+        return data[rows], ids
+
+    def count(self, student_id=None):
+        with self.lock:
+            return len(self._live(None if student_id is None else [student_id]))
+
+    def signature(self, student_ids=None):
+        """JSON-friendly value that changes whenever the selected samples change
+
+        Appends add records and replacements flag them stale, so within one
+        epoch a record count, a stale count and the last record per student
+        are enough; compaction starts a new epoch.
+        """
+        with self.lock:
+            if student_ids is None:
+                return {'epoch': self.epoch, 'records': len(self.records),
+                        'stale': int(np.count_nonzero(self.records['stale']))}
+            students = {}
+            for row in np.flatnonzero(self.records['stale'] == 0):
+                student_id = str(int(self.records['id'][row]))
+                count, _ = students.get(student_id, (0, 0))
+                students[student_id] = [count + 1, int(row)]
+        wanted = {str(int(student_id)) for student_id in student_ids}
+        return {'epoch': self.epoch,
+                'students': {student_id: value for student_id, value in students.items() if student_id in wanted}}
+
+    # Migration
+
+    def import_images(self, image_dir="student_images", workers=None):
+        """Append every {id}_{name}_{n}.jpg in image_dir; returns how many were stored"""
+        files = []
+        for img_file in sorted(os.listdir(image_dir)):
+            if not img_file.endswith(".jpg"):
+                continue
+            try:
+                files.append((int(img_file.split("_")[0]), os.path.join(image_dir, img_file)))
+            except ValueError:
+                continue
+        # cv2.imread releases the GIL, so threads decode in parallel
+        workers = workers or min(32, (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            decoded = list(pool.map(load_face, [path for _, path in files]))
+        kept = [(student_id, face) for (student_id, _), face in zip(files, decoded) if face is not None]
+        return self._append(np.array([student_id for student_id, _ in kept], dtype=np.int32),
+                            [face for _, face in kept])
+
+    def export_images(self, image_dir="student_images", names=None):
+        """Write live samples as {id}_{name}_{n}.jpg; returns how many were written"""
+        os.makedirs(image_dir, exist_ok=True)
+        names = names or {}
+        faces, ids = self.load()
+        counters = {}
+        for face, student_id in zip(faces, ids):
+            index = counters.get(student_id, 0)
+            counters[student_id] = index + 1
+            name = names.get(str(student_id), "student")
+            cv2.imwrite(os.path.join(image_dir, f"{student_id}_{name}_{index}.jpg"), face)
+        return len(ids)
+
+
+if __name__ == "__main__":
+    import config
+    from registry import Registry
+
+    parser = argparse.ArgumentParser(description="Migrate, export or compact the packed face sample store")
+    parser.add_argument("--import", dest="import_dir", metavar="DIR", help="Append the JPEG samples in DIR")
+    parser.add_argument("--export", dest="export_dir", metavar="DIR", help="Write live samples to DIR as JPEGs")
+    parser.add_argument("--compact", action="store_true", help="Drop stale samples")
+    args = parser.parse_args()
+
+    store = SampleStore(config.SAMPLE_STORE['path'])
+    if args.import_dir:
+        print(f"Imported {store.import_images(args.import_dir)} samples from {args.import_dir}")
+    if args.compact:
+        print(f"Dropped {store.compact()} stale samples")
+    if args.export_dir:
+        names = Registry(config.REGISTRY['database']).students()
+        print(f"Exported {store.export_images(args.export_dir, names)} samples to {args.export_dir}")
+    print(f"{store.count()} live samples in {store.data_path}")
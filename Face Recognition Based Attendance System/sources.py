@@ -0,0 +1,51 @@
+import os
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class ImageDirectoryCapture:
+    """cv2.VideoCapture-like reader over the images in a directory, in name order"""
+
+    def __init__(self, directory):
+        self.paths = [
+            os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        self.position = 0
+
+    def isOpened(self):
+        return self.position < len(self.paths)
+
+    def read(self):
+        while self.position < len(self.paths):
+            image = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if image is not None:
+                return True, image
+            print(f"Skipping unreadable image: {self.paths[self.position - 1]}")
+        return False, None
+
+    def release(self):
+        self.position = len(self.paths)
+
+
+def is_live(source):
+    """Camera indexes are live; video files and image directories are not"""
+    return isinstance(source, int) or str(source).isdigit()
+
+
+def open_source(source):
+    """Open a camera index, video file or image directory for reading frames"""
+    if is_live(source):
+        cap = cv2.VideoCapture(int(source))
+    elif os.path.isdir(source):
+        cap = ImageDirectoryCapture(source)
+    elif os.path.exists(source):
+        cap = cv2.VideoCapture(source)
+    else:
+        raise FileNotFoundError(f"No such video file or image directory: {source}")
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source: {source}")
+    return cap
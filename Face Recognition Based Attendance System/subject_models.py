@@ -0,0 +1,75 @@
+import os
+import json
+from collections import OrderedDict
+
+from recognizers import create_recognizer
+
+
+class SubjectModelCache:
+    """Per-subject recognizers trained only on the subject's roster
+
+    Models are saved to trainer/subjects/ with a signature of the roster and
+    its stored samples, and the most recently used ones are kept loaded in an LRU
+    cache so switching between classes doesn't reload or retrain.
+    """
+
+    def __init__(self, sample_store, settings, model_dir="trainer/subjects", capacity=4):
+        self.sample_store = sample_store
+        self.settings = settings
+        self.model_dir = model_dir
+        self.capacity = capacity
+        self.models = OrderedDict()  # subject -> (signature, recognizer)
+
+    def paths(self, subject, recognizer):
+        model_path = os.path.join(self.model_dir, f"{subject}_{recognizer.model_file}")
+        return model_path, os.path.splitext(model_path)[0] + "_manifest.json"
+
+    def signature(self, roster):
+        """Roster plus the sample store's signature for the roster's students"""
+        return {'roster': sorted(roster), 'samples': self.sample_store.signature(roster)}
+
+    def get(self, subject, roster):
+        """Return a recognizer for the subject, or None if no roster sample exists"""
+        signature = self.signature(roster)
+        if not signature['samples']['students']:
+            return None
+
+        cached = self.models.get(subject)
+        if cached is not None and cached[0] == signature:
+            self.models.move_to_end(subject)
+            return cached[1]
+
+        recognizer = create_recognizer(self.settings)
+        model_path, manifest_path = self.paths(subject, recognizer)
+        if self._saved_signature(manifest_path) == signature and os.path.exists(model_path):
+            recognizer.read(model_path)
+        else:
+            self._train(recognizer, roster)
+            os.makedirs(self.model_dir, exist_ok=True)
+            recognizer.save(model_path)
+            with open(manifest_path, 'w') as f:
+                json.dump(signature, f)
+            print(f"Trained model for {subject} on {len(roster)} students")
+
+        self.models[subject] = (signature, recognizer)
+        self.models.move_to_end(subject)
+        while len(self.models) > self.capacity:
+            self.models.popitem(last=False)
+        return recognizer
+
+    def invalidate(self, subject):
+        """Drop a subject's loaded model, e.g. after its roster changed"""
+        self.models.pop(subject, None)
+
+    def _train(self, recognizer, roster):
+        faces, ids = self.sample_store.load(roster)
+        recognizer.train(list(faces), ids)
+
+    def _saved_signature(self, manifest_path):
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,212 @@
+import time
+
+import cv2
+
+from detection import clip_box
+
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def create_cv_tracker():
+    """Return an OpenCV MOSSE tracker, or None if opencv-contrib isn't installed"""
+    legacy = getattr(cv2, 'legacy', None)
+    if legacy is not None and hasattr(legacy, 'TrackerMOSSE_create'):
+        return legacy.TrackerMOSSE_create()
+    return None
+
+
+class Track:
+    """One face followed across frames"""
+
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = box
+        self.student_id = None  # None until recognized under the threshold
+        self.confidence = None
+        self.votes = 0
+        self.candidate = None  # Last predicted student, whatever the distance
+        self.evidence = 0.0  # Sequential evidence for the candidate
+        self.evidence_at = None
+        self.last_confirmed = frame_index
+        self.last_recognized = None
+        self.missed = 0
+        self.cv_tracker = None
+
+
+class FaceTracker:
+    """Associates detections with persistent tracks and schedules recognition
+
+    Full detection only runs every detect_interval frames. In between,
+    tracks are moved with an OpenCV MOSSE tracker when available. Recognition
+    runs when a track is created and again every recheck_interval frames.
+    Votes are counted per track for every frame it is confirmed. With a
+    SequentialDecision, each prediction adds distance-weighted evidence
+    instead, and tracks are re-recognized every pending_interval frames
+    until their evidence is decided.
+    """
+
+    def __init__(self, detect_interval=5, recheck_interval=30, iou_threshold=0.3,
+                 max_missed=2, threshold=65, use_cv_tracker=True, decision=None, observer=None):
+        self.detect_interval = detect_interval
+        self.recheck_interval = recheck_interval
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.threshold = threshold
+        self.use_cv_tracker = use_cv_tracker
+        self.decision = decision
+        # observer(now, track_id, event, ...) receives 'seen' and 'predict' events, see ObservationLog
+        self.observer = observer
+        self.tracks = []
+        self.next_track_id = 1
+        self.frame_index = 0
+        self.now = 0.0
+
+    def reset(self):
+        self.tracks = []
+        self.frame_index = 0
+
+    def process(self, gray, detect_fn, recognize_fn, now=None):
+        """Advance one frame and return (box, student_id, confidence, track_id, score) per track
+
+        detect_fn(gray) returns face boxes, recognize_fn(gray, boxes) returns
+        one (student_id, confidence) per box so a backend can batch them.
+        The score is the track's vote count, or its evidence decayed to now
+        with a SequentialDecision.
+        """
+        index = self.frame_index
+        self.frame_index += 1
+        self.now = time.perf_counter() if now is None else now
+
+        if index % self.detect_interval == 0:
+            self._associate(gray, detect_fn(gray), index)
+        else:
+            self._follow(gray, index)
+
+        due = [
+            track for track in self.tracks
+            if track.last_confirmed == index
+            and (track.last_recognized is None
+                 or index - track.last_recognized >= self._recheck_interval(track))
+        ]
+        if due:
+            self._recognize(due, gray, recognize_fn, index)
+
+        return [(track.box, track.student_id, track.confidence, track.track_id, self._score(track))
+                for track in self.tracks if track.missed == 0]
+
+    def _recheck_interval(self, track):
+        if self.decision is None or self.decision.decided(self._score(track)):
+            return self.recheck_interval
+        return self.decision.pending_interval
+
+    def _score(self, track):
+        if self.decision is None:
+            return track.votes
+        if track.evidence_at is None:
+            return 0.0
+        return self.decision.decay(track.evidence, self.now - track.evidence_at)
+
+    def _associate(self, gray, boxes, index):
+        """Greedily match detections to existing tracks by IoU"""
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for b, box in enumerate(boxes):
+                overlap = iou(track.box, box)
+                if overlap >= self.iou_threshold:
+                    pairs.append((overlap, t, b))
+        pairs.sort(reverse=True)
+
+        matched_tracks = set()
+        matched_boxes = set()
+        for _, t, b in pairs:
+            if t in matched_tracks or b in matched_boxes:
+                continue
+            matched_tracks.add(t)
+            matched_boxes.add(b)
+            track = self.tracks[t]
+            track.box = tuple(int(v) for v in boxes[b])
+            self._confirm(track, index)
+            self._start_cv_tracker(track, gray)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for b, box in enumerate(boxes):
+            if b in matched_boxes:
+                continue
+            track = Track(self.next_track_id, tuple(int(v) for v in box), index)
+            self.next_track_id += 1
+            self._start_cv_tracker(track, gray)
+            self.tracks.append(track)
+
+    def _follow(self, gray, index):
+        """Move tracks between detections with their OpenCV trackers"""
+        for track in self.tracks:
+            if track.cv_tracker is None or track.missed:
+                continue
+            ok, box = track.cv_tracker.update(gray)
+            # Trackers can drift past the frame edge; keep boxes croppable
+            box = clip_box(box, gray.shape) if ok else None
+            if box is not None:
+                track.box = box
+                self._confirm(track, index)
+
+    def _confirm(self, track, index):
+        """Record that the track was seen, counting votes for the frames since the last sighting"""
+        frames = min(index - track.last_confirmed, self.detect_interval)
+        if track.student_id is not None:
+            track.votes += frames
+        if self.observer and frames and track.last_recognized is not None:
+            self.observer(self.now, track.track_id, 'seen', track.candidate, frames=frames)
+        track.last_confirmed = index
+        track.missed = 0
+
+    def _start_cv_tracker(self, track, gray):
+        if not self.use_cv_tracker:
+            return
+        track.cv_tracker = create_cv_tracker()
+        if track.cv_tracker is not None:
+            track.cv_tracker.init(gray, track.box)
+
+    def _recognize(self, tracks, gray, recognize_fn, index):
+        try:
+            results = recognize_fn(gray, [track.box for track in tracks])
+        except Exception as e:
+            # The tracks stay due, so they are tried again on the next frame
+            print(f"Error recognizing {len(tracks)} faces: {e}")
+            return
+        for track, (student_id, confidence) in zip(tracks, results):
+            track.last_recognized = index
+            track.confidence = confidence
+            if self.observer:
+                self.observer(self.now, track.track_id, 'predict', student_id, distance=confidence)
+            if student_id != track.candidate:
+                # A different student was predicted: their evidence starts from zero
+                track.candidate = student_id
+                track.evidence, track.evidence_at = 0.0, None
+            if self.decision is not None:
+                self._add_evidence(track, confidence)
+                continue
+            if confidence >= self.threshold:
+                student_id = None
+            if student_id != track.student_id:
+                # New identity (or lost confidence): start voting again
+                track.student_id = student_id
+                track.votes = 1 if student_id is not None else 0
+
+    def _add_evidence(self, track, confidence):
+        """Accumulate evidence for the predicted student; the track shows them while it's positive"""
+        track.evidence = self.decision.update(track.evidence, track.evidence_at, confidence, self.now)
+        track.evidence_at = self.now
+        track.student_id = track.candidate if track.evidence > 0 else None
@@ -0,0 +1,182 @@
+import bisect
+from tkinter import ttk
+
+
+class VirtualTable:
+    """Paged view over a ttk.Treeview backed by in-memory columnar data
+
+    Only the rows that fit in the visible area exist as Treeview items; they
+    are reused and refilled as the view scrolls, so large tables don't need
+    one item per row. Rows can be appended or removed one at a time, and a
+    prefix filter over the search columns uses sorted indexes so typing a
+    longer prefix only narrows the current matches.
+    """
+
+    def __init__(self, tree, scrollbar, columns, format_row, search_columns=(), key_column=0):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.columns = columns
+        self.format_row = format_row  # (position, row tuple) -> Treeview values
+        self.search_columns = search_columns
+        self.key_column = key_column
+
+        self.data = [[] for _ in columns]
+        self.search_index = {col: [] for col in search_columns}  # sorted (value, row index)
+        self.prefix = ""
+        self.visible_rows = None  # Row indices matching the filter, None means all
+        self.top = 0
+        self.slots = []  # Treeview item ids being reused
+        self.selected = None  # Row index of the selected row
+
+        self.scrollbar.configure(command=self.on_scroll)
+        self.tree.configure(yscrollcommand='')
+        self.tree.bind('<Configure>', lambda e: self.render())
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_by(-1 if e.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.scroll_by(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_by(1, 'units'))
+
+    # Data
+
+    def __len__(self):
+        return len(self.data[0])
+
+    def row(self, index):
+        return tuple(column[index] for column in self.data)
+
+    def set_rows(self, rows):
+        """Replace all rows"""
+        self.data = [list(column) for column in zip(*rows)] if rows else [[] for _ in self.columns]
+        self._rebuild_index()
+        self.selected = None
+        self.top = 0
+        self.filter(self.prefix, force=True)
+
+    def append_row(self, row):
+        """Add one row without rebuilding the view"""
+        index = len(self)
+        for column, value in zip(self.data, row):
+            column.append(value)
+        for col in self.search_columns:
+            bisect.insort(self.search_index[col], (str(row[col]).lower(), index))
+        if self.visible_rows is not None and self._matches(index, self.prefix):
+            self.visible_rows.append(index)
+        self.render()
+
+    def remove_row(self, key):
+        """Remove the row whose key column equals key"""
+        keys = self.data[self.key_column]
+        if key not in keys:
+            return
+        index = keys.index(key)
+        for column in self.data:
+            del column[index]
+        self._rebuild_index()
+        self.selected = None
+        self.filter(self.prefix, force=True)
+
+    def _rebuild_index(self):
+        for col in self.search_columns:
+            self.search_index[col] = sorted(
+                (str(value).lower(), index) for index, value in enumerate(self.data[col])
+            )
+
+    def _matches(self, index, prefix):
+        return not prefix or any(
+            str(self.data[col][index]).lower().startswith(prefix) for col in self.search_columns
+        )
+
+    def filter(self, prefix, force=False):
+        """Show only rows whose search columns start with prefix"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            self.visible_rows = None
+        elif (not force and self.visible_rows is not None
+              and self.prefix and prefix.startswith(self.prefix)):
+            # Narrowing the previous filter: only re-check the current matches
+            self.visible_rows = [i for i in self.visible_rows if self._matches(i, prefix)]
+        else:
+            matches = set()
+            for col in self.search_columns:
+                index = self.search_index[col]
+                start = bisect.bisect_left(index, (prefix,))
+                for value, row_index in index[start:]:
+                    if not value.startswith(prefix):
+                        break
+                    matches.add(row_index)
+            self.visible_rows = sorted(matches)
+        self.prefix = prefix
+        self.top = 0
+        self.render()
+
+    def count(self):
+        """Number of rows matching the current filter"""
+        return len(self) if self.visible_rows is None else len(self.visible_rows)
+
+    def _row_at(self, position):
+        return position if self.visible_rows is None else self.visible_rows[position]
+
+    # View
+
+    def page_size(self):
+        """Rows that fit in the Treeview's current height"""
+        height = self.tree.winfo_height()
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        if height <= 1:
+            return int(self.tree.cget('height'))
+        return max(1, (height - 25) // int(row_height))
+
+    def render(self):
+        """Fill the reused Treeview items with the rows at the current scroll position"""
+        total = self.count()
+        page = self.page_size()
+        self.top = max(0, min(self.top, total - page))
+        shown = min(page, total - self.top)
+
+        while len(self.slots) < shown:
+            self.slots.append(self.tree.insert('', 'end'))
+        while len(self.slots) > shown:
+            self.tree.delete(self.slots.pop())
+
+        selected_slot = None
+        for offset, item in enumerate(self.slots):
+            position = self.top + offset
+            index = self._row_at(position)
+            self.tree.item(item, values=self.format_row(position + 1, self.row(index)))
+            if index == self.selected:
+                selected_slot = item
+
+        if selected_slot is not None:
+            self.tree.selection_set(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + shown) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_by(self, amount, what):
+        step = self.page_size() if what == 'pages' else 1
+        self.top += int(amount) * step
+        self.render()
+        return 'break'
+
+    def on_scroll(self, action, amount, what=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, units|pages)"""
+        if action == 'moveto':
+            self.top = int(float(amount) * self.count())
+            self.render()
+        else:
+            self.scroll_by(amount, what)
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.slots:
+            self.selected = self._row_at(self.top + self.slots.index(selection[0]))
+
+    def selected_row(self):
+        """The selected row tuple, or None"""
+        if self.selected is None or self.selected >= len(self):
+            return None
+        return self.row(self.selected)